@@ -1,22 +1,18 @@
+import importlib
+import time
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from scalar_fastapi.scalar_fastapi import Layout
-
-import kernai_api
-import nltk_api
-import other_api
-import sklearn_api
-import spacy_api
-import sumy_api
-import textacy_api
-import textblob_api
-import textstat_api
 from scalar_fastapi import get_scalar_api_reference
 
-import tiktoken_api
+from util import metrics
+from util.executor import executor
+from util.utils import SpacySingleton, doc_cache, env_list, memory_usage
 
-api = FastAPI()
+api = FastAPI(default_response_class=metrics.TimedJSONResponse)
+api.state.ready = False
 
 origins = [
     "http://192.168.1.42:8000",
@@ -39,6 +35,7 @@ api.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+api.add_middleware(metrics.MetricsMiddleware)
 
 
 @api.get("/")
@@ -64,16 +61,86 @@ async def scalar_html():
         layout=Layout.MODERN
     )
 
+@api.get("/status", include_in_schema=False)
+def status():
+    return {
+        "spacy": SpacySingleton.stats(),
+        "docCache": doc_cache.stats(),
+        "executor": executor.stats(),
+        "routers": router_startup,
+        "memory": memory_usage(),
+    }
+
+
+@api.get("/ready", include_in_schema=False)
+def ready():
+    """Readiness probe: 200 once the startup preloading of this worker is done, 503 before."""
+    if not api.state.ready:
+        return JSONResponse({"ready": False}, status_code=503)
+    return {"ready": True}
+
+
+@api.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+def prometheus_metrics():
+    return metrics.render()
+
+
+@metrics.register_collector
+def cache_metrics():
+    spacy, docs, pool = SpacySingleton.stats(), doc_cache.stats(), executor.stats()
+    for result in ("hits", "misses"):
+        yield "bricks_model_cache_lookups_total", "counter", "spaCy pipeline lookups by result.", {"result": result}, spacy[result]
+    yield "bricks_model_cache_evictions_total", "counter", "spaCy pipelines evicted from memory.", {}, spacy["evictions"]
+    yield "bricks_models_loaded", "gauge", "spaCy pipelines in memory.", {}, len(spacy["models"])
+    for result, key in (("hit", "hits"), ("disk_hit", "diskHits"), ("miss", "misses")):
+        yield "bricks_doc_cache_lookups_total", "counter", "Doc cache lookups by result.", {"result": result}, docs[key]
+    yield "bricks_doc_cache_evictions_total", "counter", "Docs evicted from the in-memory Doc cache.", {}, docs["evictions"]
+    yield "bricks_doc_cache_bytes", "gauge", "Estimated size of the in-memory Doc cache.", {}, docs["bytes"]
+    yield "bricks_doc_cache_disk_evictions_total", "counter", "Docs removed from the Doc cache directory.", {}, docs["diskEvictions"]
+    yield "bricks_doc_cache_disk_bytes", "gauge", "Size of the Doc cache directory as last seen by this worker.", {}, docs["diskBytes"]
+    yield "bricks_executor_rejected_total", "counter", "Calls rejected because the executor queue was full.", {}, pool["rejected"]
+    yield "bricks_executor_in_flight", "gauge", "Calls submitted to the executor and not finished yet.", {}, pool["inFlight"]
+    yield "bricks_executor_queue_wait_seconds_total", "counter", "Time calls waited for a worker process.", {}, pool["queueWaitTotal"]
+    for kind, value in memory_usage().items():
+        yield "bricks_memory_bytes", "gauge", "Resident memory of the worker by kind (rss, pss, shared, private, ...).", {"kind": kind}, value
+
+
+@api.on_event("startup")
+def preload_models():
+    SpacySingleton.preload()
+    api.state.ready = True
+
+
+@api.on_event("shutdown")
+def stop_executor():
+    executor.shutdown()
+
 
 # download_all_models()
 
-api.include_router(spacy_api.router, prefix="/spacy", tags=["spacy"])
-api.include_router(textstat_api.router, prefix="/textstat", tags=["textstat"])
-api.include_router(nltk_api.router, prefix="/nltk", tags=["nltk"])
-api.include_router(textacy_api.router, prefix="/textacy", tags=["textacy"])
-api.include_router(textblob_api.router, prefix="/textblob", tags=["textblob"])
-api.include_router(tiktoken_api.router, prefix="/tiktoken", tags=["tiktoken"])
-api.include_router(sumy_api.router, prefix="/sumy", tags=["sumy"])
-api.include_router(sklearn_api.router, prefix="/sklearn", tags=["sklearn"])
-api.include_router(kernai_api.router, prefix="/kernai", tags=["kernai"])
-api.include_router(other_api.router, prefix="/other", tags=["other"])
+# Routers by tag, mounted under /<tag>. BRICKS_ROUTERS (e.g. "spacy,nltk") limits a deployment
+# to some of them; the others are never imported.
+ROUTERS = {
+    "spacy": "spacy_api",
+    "textstat": "textstat_api",
+    "nltk": "nltk_api",
+    "textacy": "textacy_api",
+    "textblob": "textblob_api",
+    "tiktoken": "tiktoken_api",
+    "sumy": "sumy_api",
+    "sklearn": "sklearn_api",
+    "kernai": "kernai_api",
+    "other": "other_api",
+}
+enabled_routers = env_list("BRICKS_ROUTERS") or list(ROUTERS)
+
+# seconds spent importing each router; dependencies shared by several routers are
+# counted for the first one importing them
+router_startup = {}
+for tag, module_name in ROUTERS.items():
+    if tag not in enabled_routers:
+        continue
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    router_startup[tag] = round(time.perf_counter() - start, 4)
+    api.include_router(module.router, prefix=f"/{tag}", tags=[tag])
@@ -0,0 +1,87 @@
+import json
+import os
+import random
+import zipfile
+from functools import lru_cache
+from typing import List
+
+from util.utils import LangEnum
+
+SEED_ARCHIVE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bricks-test-data-project.zip")
+
+SIZES = {"1KB": 1024, "100KB": 100 * 1024, "10MB": 10 * 1024 * 1024}
+
+# Small vocabularies for the generated text; the sentences are not meant to make sense, only
+# to have the token, sentence and entity statistics of real text in each language.
+WORDS = {
+    LangEnum.EN: {
+        "subjects": ["The team", "Our customer", "The new system", "A small company", "The manager", "Every student", "The old library", "Maria Miller", "John Smith"],
+        "verbs": ["builds", "reviews", "describes", "improves", "sends", "explains", "visits", "analyses", "remembers"],
+        "objects": ["the quarterly report", "a great battery life", "the annual budget", "several old books", "the mobile application", "a long letter", "the research results"],
+        "tails": ["before the deadline", "in Berlin", "with great care", "after a long meeting", "for the first time", "in the city of London", "without any help"],
+    },
+    LangEnum.FR: {
+        "subjects": ["L'équipe", "Notre client", "Le nouveau système", "Une petite entreprise", "Le directeur", "Chaque étudiant", "La vieille bibliothèque", "Marie Dupont", "Jean Martin"],
+        "verbs": ["construit", "examine", "décrit", "améliore", "envoie", "explique", "visite", "analyse", "rappelle"],
+        "objects": ["le rapport trimestriel", "une excellente autonomie", "le budget annuel", "plusieurs vieux livres", "l'application mobile", "une longue lettre", "les résultats de la recherche"],
+        "tails": ["avant la date limite", "à Paris", "avec beaucoup de soin", "après une longue réunion", "pour la première fois", "dans la ville de Lyon", "sans aucune aide"],
+    },
+    LangEnum.LA: {
+        "subjects": ["Caesar", "Populus Romanus", "Miles fortis", "Senatus", "Magister", "Omnis discipulus", "Vetus bibliotheca", "Marcus Tullius Cicero", "Gaius Iulius"],
+        "verbs": ["aedificat", "legit", "describit", "emendat", "mittit", "explicat", "visitat", "considerat", "meminit"],
+        "objects": ["epistulam longam", "urbem magnam", "libros antiquos", "legem novam", "exercitum Romanum", "templum deorum", "provinciam Galliam"],
+        "tails": ["ante diem constitutum", "in urbe Roma", "magna cum cura", "post longum consilium", "primum", "in Graecia", "sine ullo auxilio"],
+    },
+}
+
+# Sentences with the entities the regex and gazetteer like extractors look for.
+ENTITIES = [
+    "Contact johannes.hoetter@kern.ai or visit https://www.kern.ai/pricing for details.",
+    "The invoice of 12.50 € was paid on 2023-09-28 at 10:30 am from DE89 3704 0044 0532 0130 00.",
+    "Call +49 176 12345678 or write to 1600 Amphitheatre Parkway, Mountain View, CA 94043.",
+    "Server 192.168.1.42 answered with #fff and rgb(12, 34, 56) in /var/log/bricks.log.",
+    "About 42 % of the users wrote \"bricks are great\" and tagged #nlp.",
+]
+
+
+@lru_cache(maxsize=1)
+def seed_texts() -> List[str]:
+    """Record texts of the test data project export shipped with the repository."""
+    with zipfile.ZipFile(SEED_ARCHIVE) as archive:
+        export = json.loads(archive.read(archive.namelist()[0]))
+    return [record["data"]["data"] for record in export["records_data"] if record["data"].get("data")]
+
+
+def generated_sentence(rng: random.Random, lang: LangEnum) -> str:
+    words = WORDS[lang]
+    return f"{rng.choice(words['subjects'])} {rng.choice(words['verbs'])} {rng.choice(words['objects'])} {rng.choice(words['tails'])}."
+
+
+def build_corpus(lang: LangEnum, size: int, seed: int = 0) -> str:
+    """A deterministic text of at most ``size`` UTF-8 bytes, cut at a sentence boundary.
+
+    English paragraphs are taken from the seed project and interleaved with generated ones,
+    French and Latin are generated; every few paragraphs an entity sentence is mixed in.
+    """
+    rng = random.Random(f"{lang.name}-{size}-{seed}")
+    seeds = seed_texts() if lang == LangEnum.EN else []
+    paragraphs, length = [], 0
+    while length < size:
+        if seeds and rng.random() < 0.5:
+            paragraph = rng.choice(seeds)
+        else:
+            sentences = [generated_sentence(rng, lang) for _ in range(rng.randint(3, 8))]
+            if rng.random() < 0.3:
+                sentences.insert(rng.randrange(len(sentences)), rng.choice(ENTITIES))
+            paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph.encode("utf-8")) + 2
+
+    text = "\n\n".join(paragraphs).encode("utf-8")[:size].decode("utf-8", errors="ignore")
+    end = max(text.rfind(". "), text.rfind(".\n"))
+    return text[:end + 1] if end > 0 else text
+
+
+@lru_cache(maxsize=32)
+def get_corpus(lang: LangEnum, size_name: str, seed: int = 0) -> str:
+    return build_corpus(lang, SIZES[size_name], seed)
@@ -0,0 +1,309 @@
+"""Benchmarks the bricks endpoints on synthetic corpora.
+
+    python -m benchmarks.run run --routers=spacy,nltk --sizes=1KB,100KB --langs=EN,FR,LA
+    python -m benchmarks.run compare benchmarks/results/a.json benchmarks/results/b.json
+
+Every POST endpoint of the selected routers is called in-process (the handler function with
+its Form defaults, a JSON body or an NDJSON upload built from the corpus) and/or over HTTP
+through FastAPI's TestClient, ``repeat`` times per corpus. Results hold latency percentiles,
+throughput and peak memory and are written as JSON, with the routes that were skipped.
+"""
+import asyncio
+import datetime
+import inspect
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import time
+import tracemalloc
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+import fire
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from benchmarks.corpora import get_corpus
+from util.utils import LangEnum, doc_cache
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# endpoints that call external services, their latency is not ours to measure
+NETWORK = {
+    "/kernai/question_type_classifier/",
+    "/kernai/communication_style_classifier/",
+    "/other/language_translator/",
+    "/sumy/sumy_website_summarizer/",
+}
+
+# endpoints that do not take a text, with the arguments to benchmark them with
+URL_CASES = {
+    "/nltk/url_keyword_parser/": "https://www.kern.ai/blog/open-source-nlp-enrichments?utm_source=bricks&page=2",
+    "/other/spelling_check/": "https://huggingface.co/sentence-transformers",
+}
+
+
+def documents(text: str) -> List[str]:
+    """The paragraphs of a corpus, as the texts of the batch endpoints."""
+    return [part for part in text.split("\n\n") if part.strip()]
+
+
+# JSON body endpoints, with the fields of their request model per corpus
+BODY_CASES = {
+    "/spacy/batch_extraction/": lambda text, text2, lang: {"extractor": "email", "lang": lang, "texts": documents(text)},
+    "/spacy/text_summarization_batch/": lambda text, text2, lang: {"lang": lang, "documents": [text, documents(text)]},
+    "/spacy/corpus_frequent_words/": lambda text, text2, lang: {"lang": lang, "texts": documents(text)},
+    "/nltk/synonym_extraction_batch/": lambda text, text2, lang: {"lang": lang, "texts": documents(text)},
+    "/nltk/spelling_check_batch/": lambda text, text2, lang: {"texts": documents(text)},
+    "/nltk/url_keyword_parser_batch/": lambda text, text2, lang: {"urls": list(URL_CASES.values()) * 100},
+    "/sklearn/pairwise_similarity/": lambda text, text2, lang: {"texts": documents(text), "texts2": documents(text2), "top_k": 5},
+    "/sklearn/vectorizers/": lambda text, text2, lang: {"texts": documents(text), "hashing": True},
+}
+
+# Form endpoints that do not take a text, with the arguments replacing their defaults
+FORM_CASES = {
+    "/spacy/gazetteers/": lambda text, text2, lang: {"file": None, "entries": sorted(set(text.split()))[:1000]},
+}
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [str(item) for item in value]
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+def select_routes(app, routers: List[str]) -> List[APIRoute]:
+    """The POST routes of ``routers`` (all if empty), including those calling external services."""
+    routes = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or "POST" not in route.methods:
+            continue
+        prefix = route.path.strip("/").split("/")[0]
+        if routers and prefix not in routers:
+            continue
+        routes.append(route)
+    return routes
+
+
+def handler_kwargs(route: APIRoute, text: str, text2: str, lang: LangEnum) -> Optional[Dict[str, Any]]:
+    """Arguments of the handler: its Form defaults with the corpus as text; None if not applicable."""
+    parameters = inspect.signature(route.endpoint).parameters
+    if route.path in URL_CASES:
+        return {name: URL_CASES[route.path] if name == "url" else param.default.default for name, param in parameters.items()}
+    if route.path in FORM_CASES:
+        return {**{name: param.default.default for name, param in parameters.items()}, **FORM_CASES[route.path](text, text2, lang)}
+    if route.path in BODY_CASES:
+        return {"request": parameters["request"].annotation(**BODY_CASES[route.path](text, text2, lang))}
+    if "request" in parameters and parameters["request"].annotation is Request:
+        # streaming endpoints read the raw body, one record per line, and their options from the query
+        body = "".join(json.dumps({"id": i, "text": part}) + "\n" for i, part in enumerate(documents(text)))
+        kwargs = {name: lang if name == "lang" else param.default.default
+                  for name, param in parameters.items() if name != "request"}
+        return {"request": body.encode("utf-8"), **kwargs}
+    if "text" not in parameters:
+        return None
+
+    kwargs = {}
+    for name, param in parameters.items():
+        if name == "text":
+            kwargs[name] = text
+        elif name == "text2":
+            kwargs[name] = text2
+        elif name == "lang" and param.annotation in (LangEnum, Optional[LangEnum]):
+            kwargs[name] = lang
+        else:
+            kwargs[name] = param.default.default
+    return kwargs
+
+
+def _stream_request(body: bytes) -> Request:
+    """A request whose body arrives in chunks, as an upload does."""
+    chunks = [body[start:start + 65536] for start in range(0, len(body), 65536)]
+
+    async def receive():
+        chunk = chunks.pop(0) if chunks else b""
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    return Request({"type": "http", "method": "POST", "headers": [], "query_string": b""}, receive)
+
+
+async def _complete(result):
+    result = await result
+    if isinstance(result, StreamingResponse):
+        return b"".join([chunk if isinstance(chunk, bytes) else chunk.encode("utf-8") async for chunk in result.body_iterator])
+    return result
+
+
+def call_in_process(route: APIRoute, kwargs: Dict[str, Any]):
+    if isinstance(kwargs.get("request"), bytes):
+        kwargs = {**kwargs, "request": _stream_request(kwargs["request"])}
+    result = route.endpoint(**kwargs)
+    if inspect.isawaitable(result):
+        result = asyncio.run(_complete(result))
+    return result
+
+
+def _form_value(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def call_http(client: TestClient, route: APIRoute, kwargs: Dict[str, Any]):
+    if isinstance(kwargs.get("request"), bytes):
+        params = {name: [_form_value(item) for item in value] if isinstance(value, list) else _form_value(value)
+                  for name, value in kwargs.items() if name != "request"}
+        response = client.post(route.path, params=params, data=kwargs["request"], headers={"Content-Type": "application/x-ndjson"})
+    elif isinstance(kwargs.get("request"), BaseModel):
+        response = client.post(route.path, data=kwargs["request"].json(), headers={"Content-Type": "application/json"})
+    else:
+        data = {
+            name: [_form_value(item) for item in value] if isinstance(value, list) else _form_value(value)
+            for name, value in kwargs.items() if value is not None
+        }
+        response = client.post(route.path, data=data)
+    response.raise_for_status()
+    return response.content
+
+
+def measure(call, repeat: int, warm_cache: bool) -> Dict[str, Any]:
+    # one untimed call loads the models and fills lazily built state
+    call()
+    timings = []
+    for _ in range(repeat):
+        if not warm_cache:
+            doc_cache.clear()
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+
+    if not warm_cache:
+        doc_cache.clear()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "n": repeat,
+        "mean": sum(timings) / len(timings),
+        "p50": percentile(timings, 50),
+        "p95": percentile(timings, 95),
+        "p99": percentile(timings, 99),
+        "peakAllocatedBytes": peak,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(routers: Any = None,
+        sizes: Any = "1KB,100KB",
+        langs: Any = "EN,FR,LA",
+        modes: Any = "inprocess,http",
+        repeat: int = 5,
+        warm_cache: bool = False,
+        output: Optional[str] = None):
+    """Benchmarks the endpoints of ``routers`` (all if empty) and writes the results as JSON.
+
+    ``sizes`` are any of 1KB, 100KB and 10MB; ``modes`` any of inprocess and http. Unless
+    ``warm_cache`` is set the Doc cache is cleared before every call, so each call parses.
+    """
+    from api import api
+
+    routers, sizes, langs, modes = _as_list(routers), _as_list(sizes), _as_list(langs), _as_list(modes)
+    client = TestClient(api) if "http" in modes else None
+    results = []
+    skipped = {}
+    for route in select_routes(api, routers):
+        if route.path in NETWORK:
+            skipped[route.path] = "calls an external service"
+            continue
+        for lang_name in langs:
+            lang = LangEnum[lang_name.upper()]
+            for size in sizes:
+                text, text2 = get_corpus(lang, size), get_corpus(lang, size, seed=1)
+                kwargs = handler_kwargs(route, text, text2, lang)
+                if kwargs is None:
+                    skipped[route.path] = "no benchmark arguments for its parameters"
+                    continue
+                for mode in modes:
+                    if mode == "http":
+                        call = lambda: call_http(client, route, kwargs)
+                    else:
+                        call = lambda: call_in_process(route, kwargs)
+
+                    result = {"route": route.path, "mode": mode, "lang": lang.name, "size": size, "bytes": len(text.encode("utf-8"))}
+                    try:
+                        result.update(measure(call, repeat, warm_cache))
+                        result["requestsPerSecond"] = 1 / result["mean"] if result["mean"] else None
+                        result["bytesPerSecond"] = result["bytes"] / result["mean"] if result["mean"] else None
+                    except Exception as e:
+                        result["error"] = f"{type(e).__name__}: {e}"[:500]
+                    print(json.dumps(result))
+                    results.append(result)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "warmCache": warm_cache,
+            # kilobytes on Linux
+            "maxRssKilobytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "results": results,
+        "skipped": [{"route": path, "reason": reason} for path, reason in sorted(skipped.items())],
+    }
+    for entry in report["skipped"]:
+        print(json.dumps(entry))
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.datetime.now().strftime('%Y_%m_%d_%H_%M_%S')}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    return output
+
+
+def compare(baseline: str, candidate: str, metric: str = "p50", threshold: float = 0.1):
+    """Prints the cases whose ``metric`` changed by more than ``threshold`` (relative) between two runs."""
+    def load(path):
+        with open(path) as f:
+            return {(r["route"], r["mode"], r["lang"], r["size"]): r for r in json.load(f)["results"]}
+
+    before, after = load(baseline), load(candidate)
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key].get(metric), after[key].get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if abs(change) >= threshold:
+            print(f"{' '.join(key):<70} {old:.4f} -> {new:.4f} ({change:+.0%})")
+
+
+def corpus(lang: str = "EN", size: str = "1KB", seed: int = 0):
+    """Prints a benchmark corpus."""
+    print(get_corpus(LangEnum[lang.upper()], size, seed))
+
+
+if __name__ == "__main__":
+    fire.Fire({"run": run, "compare": compare, "corpus": corpus})
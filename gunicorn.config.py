@@ -3,9 +3,26 @@
 """
 Gunicorn Uvicorn config to lauch in Digital Ocean's App Platform.
 Using their Flask template: https://github.com/digitalocean/sample-flask
+
+With BRICKS_PRELOAD=1 the app is imported in the master, which loads the spaCy pipelines
+(SPACY_PRELOAD, all languages by default), the NLTK corpora and the VADER lexicon once
+before forking, so the workers share them copy-on-write instead of each loading a copy.
+Shared and private memory per worker are reported under "memory" in /status.
 """
+import os
 
 bind = "0.0.0.0:8080"
-workers = 4
+workers = int(os.environ.get("WEB_CONCURRENCY") or 4)
 # Using Uvicorn's Gunicorn worker class
 worker_class = "uvicorn.workers.UvicornWorker"
+
+preload_app = os.environ.get("BRICKS_PRELOAD", "0").lower() in ("1", "true", "yes")
+
+
+def when_ready(server):
+    # runs in the master once, after the app was loaded and before the workers are forked
+    if preload_app:
+        import api
+        from util.preload import preload_resources
+
+        preload_resources(api.enabled_routers)
@@ -3,7 +3,9 @@ from fastapi import APIRouter
 from fastapi import Form
 import requests
 
-router = APIRouter()
+from util.profiling import ProfilingRoute
+
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/question_type_classifier/",
              summary="Uses custom E5 model to classify the question type of a text.",
@@ -1,6 +1,8 @@
 
 import re
-from typing import Optional
+from functools import lru_cache
+from itertools import chain
+from typing import FrozenSet, Iterable, List, NamedTuple, Optional
 from urllib.parse import urlparse
 
 from fastapi import APIRouter
@@ -8,12 +10,16 @@ from fastapi import Form
 from nltk import ngrams
 from nltk.corpus import brown
 from nltk.corpus import stopwords
-from nltk.corpus import wordnet
 from nltk.corpus import words
+from pydantic import BaseModel
 
+from nltk_api.synonyms import find_synonyms
+from util.alignment import labeled_spans, token_spans
+from util.lexicon import Lexicon
+from util.profiling import ProfilingRoute
 from util.utils import LangEnum, SpacySingleton
 
-router = APIRouter()
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/smalltalk_extraction/",
              summary="Detects smalltalk languages from chats",
@@ -41,15 +47,15 @@ def smalltalk_extraction(text: Optional[str] = Form('''"Hello, how are you?" he
                          lang: Optional[LangEnum] = Form(LangEnum.EN),
                          stop_words: str = Form("english")):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
+    doc = SpacySingleton.get_doc(lang, text, tokenizer_only=True)
     sw = stopwords.words(stop_words)
     regex = re.compile(r"\".*?\"")
 
     smalltalk = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
+    for span in token_spans(doc, [match.span() for match in regex.finditer(text)]):
+        if span is None:
+            continue
+        span = doc[span[0]:span[1]]
         text_list_original = span.text.replace('"', '').replace(',', '').split()
         new_text = []
         stop_words = []
@@ -125,36 +131,35 @@ def synonym_extraction(text: Optional[str] = Form("My sister is good at playing
                        lang: Optional[LangEnum] = Form(LangEnum.EN),
                        target_word: str = Form("Soccer")):
 
-    # Find synonyms using wordnet
-    synonyms = []
-    for syn in wordnet.synsets(target_word):
-        for i in syn.lemmas():
-            synonyms.append(i.name())
+    doc = SpacySingleton.get_doc(lang, text, tokenizer_only=True)
+    return {"synonyms": labeled_spans(doc, "synonym", find_synonyms(text, target_word))}
 
-    # Word are sometimes connected by a _, which we want to remove
-    split_synonyms = [item.split(sep="_") for item in synonyms]
 
-    # Break up potential list of lists into a single list
-    combined_synonyms = [item for sublist in split_synonyms for item in sublist]
+class SynonymBatchRequest(BaseModel):
+    texts: List[str]
+    lang: LangEnum = LangEnum.EN
+    target_word: str = "Soccer"
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
 
-    # Get the span of found matches
-    synonym_matches = []
-    for word in combined_synonyms:
-        try:
-            pattern = rf"({word})"
-            match = re.search(pattern, text)
-
-            start, end = match.span()
-            span = doc.char_span(start, end, alignment_mode="expand")
+@router.post("/synonym_extraction_batch/",
+             summary="Finds the synonyms of a target word in many texts.",
+             description=
+             """
+             The target word is expanded once and matched over all texts; each result holds the
+             `["synonym", start, end]` token spans of every occurrence, in input order.
 
-            synonym_matches.append(["synonym", span.start, span.end])
-        except:
-            pass
+             ## Examples:
+             - {"texts": ["My sister is good at playing football.", "Soccer is played with a ball."], "target_word": "Soccer"}
+             """)
+def synonym_extraction_batch(request: SynonymBatchRequest):
 
-    return {"synonyms": synonym_matches}
+    docs = SpacySingleton.get_docs(request.lang, request.texts, tokenizer_only=True)
+    return {
+        "results": [
+            {"synonyms": labeled_spans(doc, "synonym", find_synonyms(text, request.target_word))}
+            for text, doc in zip(request.texts, docs)
+        ]
+    }
 
 
 @router.post("/nltk_ngram_generator/",
@@ -173,8 +178,7 @@ def nltk_ngram_generator(text: Optional[str] = Form("Despite the unpredictable w
                          lang: Optional[LangEnum] = Form(LangEnum.EN),
                          ngram_size: int = Form(2)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
+    doc = SpacySingleton.get_doc(lang, text, tokenizer_only=True)
     tokens = [token.text for token in doc]
     n_grams = list(ngrams(tokens, ngram_size))
 
@@ -195,22 +199,55 @@ def nltk_ngram_generator(text: Optional[str] = Form("Despite the unpredictable w
              """)
 def spelling_check(text: Optional[str] = Form("The sun is shinng brigt today.")):
 
-    words_corpus = words.words()
-    brown_corpus = brown.words()
-    word_list = set(words_corpus + brown_corpus)
-    text_list_lower = text.replace(',', '').replace('.', '').lower().split()
-    text_list_original = text.replace(',', '').replace('.', '').split()
-
-    misspelled = []
-    for i, _ in enumerate(text_list_lower):
-        if text_list_lower[i] not in word_list and text_list_original[i] not in word_list:
-            misspelled.append(text_list_original[i])
-    if len(misspelled) > 0:
+    if misspelled_tokens(text or ""):
         return {"mistakes": "contains spelling errors"}
     else:
         return {"mistakes": "no spelling errors"}
 
 
+class SpellingBatchRequest(BaseModel):
+    texts: List[str]
+
+
+@router.post("/spelling_check_batch/",
+             summary="Returns the misspelled words of many texts with their character offsets.",
+             description=
+             """
+             Each result lists `[word, start, end]` for the words found in neither the NLTK words
+             nor the Brown corpus, in the order they appear in the text.
+
+             ## Examples:
+             - {"texts": ["The sun is shinng brigt today.", "No errors here."]}
+             """)
+def spelling_check_batch(request: SpellingBatchRequest):
+
+    return {"results": [{"mistakes": misspelled_tokens(text)} for text in request.texts]}
+
+
+@lru_cache(maxsize=1)
+def get_english_lexicon() -> Lexicon:
+    """NLTK words and Brown corpus tokens, built once into the data directory and memory-mapped."""
+    return Lexicon.load("nltk-words-brown", lambda: chain(words.words(), brown.words()))
+
+
+def misspelled_tokens(text: str) -> List[list]:
+    """``[word, start, end]`` of the words (split at whitespace, without "," and ".") not in the lexicon.
+
+    The offsets are those of the word in the text, leading and trailing "," and "." excluded.
+    """
+    lexicon = get_english_lexicon()
+    known = {}
+    misspelled = []
+    # whitespace separated tokens with their leading and trailing "," and "." cut off
+    for match in re.finditer(r"[^\s,.](?:\S*[^\s,.])?", text):
+        word = match.group(0).replace(',', '').replace('.', '')
+        if word not in known:
+            known[word] = word.lower() in lexicon or word in lexicon
+        if not known[word]:
+            misspelled.append([word, match.start(), match.end()])
+    return misspelled
+
+
 @router.post("/url_keyword_parser/",
              summary="Checks for spelling errors in a text.",
              description=
@@ -247,85 +284,157 @@ def url_keyword_parser(url: str = Form("https://stackoverflow.com/questions/1956
                        ):
 
     """Extract keywords from a url."""
-    url = url
-    if checkValidUrl and not valid_url(url):
+    options = KeywordOptions(includeDomain,
+                             includeParameter,
+                             checkValidUrl,
+                             removeNoneEnglish,
+                             removeStopwords,
+                             removeHexLike,
+                             textSeperator,
+                             splitRegex,
+                             normalize_white_list((wordWhiteList or "").split(",")))
+    return url_keywords(url, options)
+
+
+def normalize_white_list(entries: Iterable[str]) -> FrozenSet[str]:
+    """Whitelisted words as compared with the url parts: stripped, lowercased, empty ones dropped."""
+    return frozenset(entry.strip().lower() for entry in entries if entry and entry.strip())
+
+
+class KeywordOptions(NamedTuple):
+    includeDomain: bool = True
+    includeParameter: bool = True
+    checkValidUrl: bool = True
+    removeNoneEnglish: bool = False
+    removeStopwords: bool = True
+    removeHexLike: bool = True
+    textSeperator: str = ", "
+    splitRegex: str = "\\W"
+    wordWhiteList: FrozenSet[str] = frozenset()
+
+
+class UrlKeywordBatchRequest(BaseModel):
+    urls: List[str]
+    includeDomain: bool = True
+    includeParameter: bool = True
+    checkValidUrl: bool = True
+    removeNoneEnglish: bool = False
+    removeStopwords: bool = True
+    removeHexLike: bool = True
+    textSeperator: str = ", "
+    splitRegex: str = "\\W"
+    wordWhiteList: Optional[List[str]] = None
+
+
+@router.post("/url_keyword_parser_batch/",
+             summary="Extracts the keywords of many urls at once.",
+             description=
+             """
+             Takes the options of `url_keyword_parser` once for all `urls` and returns the keywords
+             of each url in input order. Repeated urls and url parts (domains, paths, ...) are only
+             split and filtered once.
+
+             ## Examples:
+             - {"urls": ["https://stackoverflow.com/questions/19560498/faster-way-to-remove-stop-words-in-python", "https://www.kern.ai/pricing?plan=team"]}
+             """)
+def url_keyword_parser_batch(request: UrlKeywordBatchRequest):
+
+    options = KeywordOptions(request.includeDomain,
+                             request.includeParameter,
+                             request.checkValidUrl,
+                             request.removeNoneEnglish,
+                             request.removeStopwords,
+                             request.removeHexLike,
+                             request.textSeperator,
+                             request.splitRegex,
+                             normalize_white_list(request.wordWhiteList or ()))
+    return {"results": [url_keywords(url, options) for url in request.urls]}
+
+
+@lru_cache(maxsize=65536)
+def url_keywords(url: str, options: KeywordOptions) -> str:
+    if options.checkValidUrl and not valid_url(url):
         return ""
     url_obj = urlparse(url)
-    keywords = extract_part(url_obj.path,
-                            removeNoneEnglish,
-                            removeStopwords,
-                            removeHexLike,
-                            splitRegex,
-                            wordWhiteList)
-    if includeDomain:
-        keywords = (keywords |
-                    extract_part(url_obj.netloc,
-                                 removeNoneEnglish,
-                                 removeStopwords,
-                                 removeHexLike,
-                                 splitRegex,
-                                 wordWhiteList))
-    if includeParameter:
-        keywords = (keywords |
-                    extract_part(url_obj.params,
-                                 removeNoneEnglish,
-                                 removeStopwords,
-                                 removeHexLike,
-                                 splitRegex,
-                                 wordWhiteList) |
-                    extract_part(url_obj.query,
-                                 removeNoneEnglish,
-                                 removeStopwords,
-                                 removeHexLike,
-                                 splitRegex,
-                                 wordWhiteList) |
-                    extract_part(url_obj.fragment,
-                                 removeNoneEnglish,
-                                 removeStopwords,
-                                 removeHexLike,
-                                 splitRegex,
-                                 wordWhiteList))
-    if not textSeperator:
+    parts = [url_obj.path]
+    if options.includeDomain:
+        parts.append(url_obj.netloc)
+    if options.includeParameter:
+        parts.extend((url_obj.params, url_obj.query, url_obj.fragment))
+
+    keywords = set()
+    for part in parts:
+        if part:
+            keywords |= _extract_part(part,
+                                      options.removeNoneEnglish,
+                                      options.removeStopwords,
+                                      options.removeHexLike,
+                                      options.splitRegex,
+                                      options.wordWhiteList)
+    if not options.textSeperator:
         return " ".join(keywords)
-    return textSeperator.join(keywords)
+    return options.textSeperator.join(keywords)
+
 
 def extract_part(part,
-                 removeNoneEnglish: bool = Form(False),
-                 removeStopwords: bool = Form(True),
-                 removeHexLike: bool = Form(True),
-                 splitRegex: str = "\W",
-                 wordWhiteList: [] = Form(None),
+                 removeNoneEnglish: bool = False,
+                 removeStopwords: bool = True,
+                 removeHexLike: bool = True,
+                 splitRegex: str = "\\W",
+                 wordWhiteList: Optional[List[str]] = None,
                  ):
-    english_stopwords = set(stopwords.words("english"))
-    white_list = set(wordWhiteList)
-    split_regex = re.compile(splitRegex)
-    english_words = set(words.words())
-
     if not part:
         return set()
+    return set(_extract_part(part, removeNoneEnglish, removeStopwords, removeHexLike, splitRegex, frozenset(wordWhiteList or ())))
 
-    remaining = set([w.lower() for w in re.split(split_regex, part) if len(w) > 0])
+
+@lru_cache(maxsize=65536)
+def _extract_part(part: str,
+                  removeNoneEnglish: bool,
+                  removeStopwords: bool,
+                  removeHexLike: bool,
+                  splitRegex: str,
+                  white_list: FrozenSet[str]) -> FrozenSet[str]:
+    remaining = set([w.lower() for w in compiled_regex(splitRegex).split(part) if len(w) > 0])
     must_keep = remaining & white_list
     if removeStopwords:
-        remaining = remaining - english_stopwords
+        remaining = remaining - english_stopwords()
     if removeNoneEnglish:
-        remaining = remaining & english_words
+        remaining = remaining & english_words()
     if removeHexLike:
         remaining = {w for w in remaining if not is_hex(w)}
 
-    return remaining | must_keep
+    return frozenset(remaining | must_keep)
+
+
+@lru_cache(maxsize=1)
+def english_stopwords() -> FrozenSet[str]:
+    return frozenset(stopwords.words("english"))
+
+
+@lru_cache(maxsize=1)
+def english_words() -> FrozenSet[str]:
+    return frozenset(words.words())
+
+
+@lru_cache(maxsize=256)
+def compiled_regex(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+URL_REGEX = re.compile(
+    r'^(?:http|ftp)s?://' # http:// or https://
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|' #domain...
+    r'localhost|' #localhost...
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})' # ...or ip
+    r'(?::\d+)?' # optional port
+    r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
 
 def valid_url(url):
-    url_regex = re.compile(
-        r'^(?:http|ftp)s?://' # http:// or https://
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+(?:[A-Z]{2,6}\.?|[A-Z0-9-]{2,}\.?)|' #domain...
-        r'localhost|' #localhost...
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})' # ...or ip
-        r'(?::\d+)?' # optional port
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
     if not url:
         return False
-    return re.match(url_regex, url) is not None
+    return URL_REGEX.match(url) is not None
 
 def is_hex(part):
     try:
@@ -0,0 +1,82 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+from typing import List, Tuple
+
+from util.utils import data_dir
+
+
+class SynonymIndex:
+    """WordNet synonyms of target words, persisted in a SQLite table shared by all workers.
+
+    A target is looked up in WordNet once per box; later lookups (and restarts) read the
+    stored expansion, so WordNet is only loaded when a new target word comes in.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS synonyms (target TEXT PRIMARY KEY, words TEXT NOT NULL)")
+            self._connection.commit()
+        return self._connection
+
+    def get(self, target: str) -> Tuple[str, ...]:
+        with self._lock:
+            row = self._connect().execute("SELECT words FROM synonyms WHERE target = ?", (target,)).fetchone()
+        if row is not None:
+            return tuple(json.loads(row[0]))
+
+        words = expand(target)
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO synonyms VALUES (?, ?)", (target, json.dumps(words)))
+            connection.commit()
+        return words
+
+
+def expand(target: str) -> Tuple[str, ...]:
+    """Words of the WordNet lemmas of ``target``; multi-word lemmas (``association_football``) are split."""
+    from nltk.corpus import wordnet
+
+    words = []
+    for synset in wordnet.synsets(target):
+        for lemma in synset.lemmas():
+            words.extend(lemma.name().split("_"))
+    return tuple(dict.fromkeys(word for word in words if word))
+
+
+@lru_cache(maxsize=1)
+def get_index() -> SynonymIndex:
+    return SynonymIndex(os.path.join(data_dir("synonyms"), "wordnet.sqlite3"))
+
+
+@lru_cache(maxsize=4096)
+def synonyms(target: str) -> Tuple[str, ...]:
+    return get_index().get(target)
+
+
+@lru_cache(maxsize=1024)
+def synonym_matcher(words: Tuple[str, ...]):
+    """One compiled alternation over all words, longest first so the longest word wins at a position.
+
+    Only whole words match, a short lemma like ``ball`` is not found inside ``football``.
+    """
+    if not words:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True)) + r")\b")
+
+
+def find_synonyms(text: str, target: str) -> List[Tuple[int, int]]:
+    """Character spans of every occurrence of a synonym of ``target`` in ``text``, in one pass."""
+    matcher = synonym_matcher(synonyms(target))
+    if matcher is None:
+        return []
+    return [match.span() for match in matcher.finditer(text)]
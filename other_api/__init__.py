@@ -1,23 +1,19 @@
 import html
 import unicodedata
+from functools import lru_cache
 from typing import Optional
 from urllib.parse import urlsplit
 
-from LeXmo import LeXmo
-from better_profanity import profanity
-from bs4 import BeautifulSoup
 from fastapi import APIRouter
 from fastapi import Form
-from translate import Translator
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
+from util.profiling import ProfilingRoute
 from util.utils import LangEnum
 
-import dateutil.parser as dparser
-import holidays
-from langdetect import detect
+# The libraries of these routes are imported in the handlers, so a worker only pays for the
+# ones of the routes it serves.
 
-router = APIRouter()
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/language_detection/",
              summary="Detects the language of a given text.",
@@ -30,6 +26,8 @@ router = APIRouter()
              """)
 def language_detection(text: str = Form("This is an english sentence.")):
 
+    from langdetect import detect
+
     if not text or not text.strip():
         return {"language": "unknown"}
     return {"language": detect(text)}
@@ -115,9 +113,7 @@ ALLOWED_RANGE = set(range(32, 127)).union( # Basic Latin
              """)
 def vader_sentiment_classifier(text: Optional[str] = Form('World peace announced by the United Nations.')):
 
-    analyzer = SentimentIntensityAnalyzer()
-
-    vs = analyzer.polarity_scores(text)
+    vs = get_vader_analyzer().polarity_scores(text)
     if vs["compound"] >= 0.05:
         return {"sentiment": "positive"}
     elif vs["compound"] > -0.05:
@@ -126,6 +122,13 @@ def vader_sentiment_classifier(text: Optional[str] = Form('World peace announced
         return {"sentiment": "negative"}
 
 
+@lru_cache(maxsize=1)
+def get_vader_analyzer():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+    return SentimentIntensityAnalyzer()
+
+
 @router.post("/profanity_detection/",
              summary="Detects if a given text contains abusive language.",
              description=
@@ -137,6 +140,8 @@ def vader_sentiment_classifier(text: Optional[str] = Form('World peace announced
              """)
 def profanity_detection(text: str = Form('You suck man!')):
 
+    from better_profanity import profanity
+
     result = profanity.contains_profanity(text)
     return {"profanity": result}
 
@@ -158,6 +163,8 @@ def emotionality_detection(text: str = Form("""As Harry went inside the Chamber
             snake attacked Harry but fortunately, Harry dodged and ran into one of the sewer lines while the serpent 
             followed. The Basilisk couldn't be killed with bare hands but only with a worthy weapon.""")):
 
+    from LeXmo import LeXmo
+
     try:
         emo = LeXmo.LeXmo(text)
         del emo["text"]
@@ -185,6 +192,9 @@ def emotionality_detection(text: str = Form("""As Harry went inside the Chamber
 def workday_classifier(text: Optional[str] = Form('01.01.2023 is a holiday in Germany.'),
                       lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
+    import dateutil.parser as dparser
+    import holidays
+
     # try to parse the date from the string
     try:
         date = dparser.parse(text, fuzzy=True).date()
@@ -218,6 +228,8 @@ def language_translator(text: Optional[str] = Form('Salut, comment allez-vous ?'
                         lang: Optional[LangEnum] = Form(LangEnum.FR),
                         lang_to: Optional[LangEnum] = Form(LangEnum.EN)):
 
+    from translate import Translator
+
     translator = Translator(from_lang=lang.name.lower(), to_lang=lang_to.name.lower())
     translation = translator.translate(text)
     return {"translation": translation}
@@ -292,6 +304,8 @@ def html_cleanser(text: Optional[str] = Form("""
             </html>
             """)):
 
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(text, "html.parser")
 
     # Remove any line breakers as well
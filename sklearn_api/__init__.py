@@ -1,16 +1,19 @@
 import math
-from typing import Optional
+from typing import List, Optional
 
 import numpy as np
 from fastapi import APIRouter
-from fastapi import Form
+from fastapi import Form, HTTPException
 from numpy import dot
 from numpy.linalg import norm
-from sklearn.feature_extraction.text import TfidfVectorizer
-from Levenshtein import distance
-from scipy.spatial.distance import hamming
+from pydantic import BaseModel, Field
 
-router = APIRouter()
+from sklearn_api.similarity import MetricEnum, pair_value, pairwise
+from sklearn_api.vectorizers import MAX_FEATURES, get_store, register
+from util.executor import execute
+from util.profiling import ProfilingRoute
+
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/cosine_similarity/",
              summary="Calculates the cosine similarity between two sentences.",
@@ -22,17 +25,23 @@ router = APIRouter()
              - la
              """)
 def cosine_similarity(text: Optional[str] = Form('Ten amazing facts about planet Mars.'),
-                      text2: Optional[str] = Form('Ten amazing facts about the sun')):
+                      text2: Optional[str] = Form('Ten amazing facts about the sun'),
+                      vectorizer_id: Optional[str] = Form(None)):
 
-    # Transform sentences to a vector
-    tfidf = TfidfVectorizer()
-    vects = tfidf.fit_transform([text.lower(), text2.lower()])
-    vects = vects.todense()
-    vect_one, vect_two = np.squeeze(np.asarray(vects[0])), np.squeeze(np.asarray(vects[1]))
+    from sklearn.feature_extraction.text import TfidfVectorizer
 
     # Calculate the cosine similarity between the two vectors
     try:
-        cos_sim = dot(vect_one, vect_two)/(norm(vect_one)*norm(vect_two))
+        if vectorizer_id is not None:
+            cos_sim = _pair_value(text, text2, MetricEnum.COSINE, vectorizer_id)
+        else:
+            # Transform sentences to a vector
+            tfidf = TfidfVectorizer()
+            vects = tfidf.fit_transform([text.lower(), text2.lower()])
+            vects = vects.todense()
+            vect_one, vect_two = np.squeeze(np.asarray(vects[0])), np.squeeze(np.asarray(vects[1]))
+            cos_sim = dot(vect_one, vect_two)/(norm(vect_one)*norm(vect_two))
+
         if cos_sim <= 0.5:
             return {"cosineSimilarity": "Not similar"}
         elif 0.5 < cos_sim < 0.75:
@@ -55,7 +64,13 @@ def cosine_similarity(text: Optional[str] = Form('Ten amazing facts about planet
              - la
              """)
 def manhattan_distance(text: Optional[str] = Form('The quick brown fox jumps over the lazy dog.'),
-                       text2: Optional[str] = Form('The quick yellow cat jumps over the lazy dog.')):
+                       text2: Optional[str] = Form('The quick yellow cat jumps over the lazy dog.'),
+                       vectorizer_id: Optional[str] = Form(None)):
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    if vectorizer_id is not None:
+        return {"manhattanDistance": _pair_value(text, text2, MetricEnum.MANHATTAN, vectorizer_id)}
 
     # Transform sentences to a vector
     tfidf = TfidfVectorizer()
@@ -81,6 +96,8 @@ def levenshtein_distance(text: Optional[str] = Form("John Doe"),
                          deletion: Optional[int] = Form(1),
                          substitution: Optional[int] = Form(1)):
 
+    from Levenshtein import distance
+
     if insertion is not None:
         weights_tuple = (
             insertion,
@@ -105,6 +122,9 @@ def levenshtein_distance(text: Optional[str] = Form("John Doe"),
 def hamming_distance(text: str = Form("Grandpa is eating!"),
                      text2: str = Form("Let's eat, Grandpa!")):
 
+    from scipy.spatial.distance import hamming
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
     tfidf = TfidfVectorizer().fit_transform([text, text2])
 
     dense = tfidf.toarray()
@@ -128,7 +148,13 @@ def hamming_distance(text: str = Form("Grandpa is eating!"),
              - la
              """)
 def euclidean_distance(text: str = Form("Grandpa is eating!"),
-                       text2: str = Form("Let's eat, Grandpa!")):
+                       text2: str = Form("Let's eat, Grandpa!"),
+                       vectorizer_id: Optional[str] = Form(None)):
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    if vectorizer_id is not None:
+        return {"euclidean_distance": _pair_value(text, text2, MetricEnum.EUCLIDEAN, vectorizer_id)}
 
     # Transform sentences to a vector
     tfidf = TfidfVectorizer()
@@ -139,4 +165,102 @@ def euclidean_distance(text: str = Form("Grandpa is eating!"),
     # Calculate the euclidean distance
     euc_distance = np.linalg.norm(vect_one - vect_two)
 
-    return {"euclidean_distance": euc_distance}
\ No newline at end of file
+    return {"euclidean_distance": euc_distance}
+
+
+class PairwiseRequest(BaseModel):
+    texts: List[str]
+    texts2: Optional[List[str]] = None
+    metric: MetricEnum = MetricEnum.COSINE
+    top_k: Optional[int] = None
+    threshold: Optional[float] = None
+    vectorizer_id: Optional[str] = None
+
+
+@router.post("/pairwise_similarity/",
+             summary="Compares every text of one list with every text of another one (or of itself).",
+             description=
+             """
+             The texts are vectorized with the registered vectorizer `vectorizer_id` if given (see
+             `/vectorizers/`), else with one TF-IDF vectorizer fitted on all texts, and the
+             comparisons run on the sparse vectors in row blocks. `metric` is `cosine` (similarity), `euclidean` or `manhattan`
+             (distances). The response holds
+             - `topK`: the `[column, value]` of the `top_k` best matches per text, if `top_k` is given,
+             - `pairs`: the `[row, column, value]` with a similarity at or above (distance at or below)
+               `threshold`, if only `threshold` is given,
+             - `matrix`: all values otherwise.
+
+             Without `texts2` the texts are compared with each other; `topK` and `pairs` leave out
+             the comparison of a text with itself, `matrix` keeps it on its diagonal.
+
+             ## Examples:
+             - {"texts": ["Ten amazing facts about planet Mars.", "Ten amazing facts about the sun", "The quick brown fox."], "top_k": 1}
+             """)
+def pairwise_similarity(request: PairwiseRequest):
+
+    try:
+        return execute(pairwise,
+                       request.texts,
+                       request.texts2,
+                       request.metric,
+                       request.top_k,
+                       request.threshold,
+                       request.vectorizer_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown vectorizer {request.vectorizer_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _pair_value(text: str, text2: str, metric: MetricEnum, vectorizer_id: str) -> float:
+    try:
+        return execute(pair_value, text, text2, metric, vectorizer_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown vectorizer {vectorizer_id}")
+
+
+class VectorizerRequest(BaseModel):
+    texts: List[str]
+    hashing: bool = False
+    n_features: int = Field(2 ** 20, ge=1, le=MAX_FEATURES)
+
+
+@router.post("/vectorizers/",
+             summary="Fits a vectorizer on a reference corpus for the similarity routes.",
+             description=
+             """
+             Fits a TF-IDF vectorizer on `texts`, or with `hashing` a HashingVectorizer of
+             `n_features` columns plus IDF weights, which transforms without a vocabulary. The
+             vectorizer is stored; the returned `id` is passed as `vectorizer_id` to
+             `/cosine_similarity/`, `/euclidean_distance/`, `/manhattan_distance/` and
+             `/pairwise_similarity/`, so a request only transforms its texts. Fitting the same
+             corpus again returns the same id. The id `hashing` is a stateless HashingVectorizer
+             that needs no fitting.
+
+             ## Examples:
+             - {"texts": ["Ten amazing facts about planet Mars.", "Ten amazing facts about the sun", "The quick brown fox."]}
+             """)
+def register_vectorizer(request: VectorizerRequest):
+
+    if not request.texts:
+        raise HTTPException(status_code=422, detail="No texts given")
+    try:
+        return execute(register, request.texts, request.hashing, request.n_features)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/vectorizers/{vectorizer_id}", summary="Returns the metadata of a registered vectorizer.")
+def vectorizer_info(vectorizer_id: str):
+    try:
+        return get_store().info(vectorizer_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown vectorizer {vectorizer_id}")
+
+
+@router.delete("/vectorizers/{vectorizer_id}", summary="Deletes a registered vectorizer.")
+def delete_vectorizer(vectorizer_id: str):
+    try:
+        return get_store().delete(vectorizer_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown vectorizer {vectorizer_id}")
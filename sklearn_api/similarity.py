@@ -0,0 +1,187 @@
+from enum import Enum
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from sklearn_api.vectorizers import get_store
+
+# arrays of the size of one block (or one group of term pairs) that are alive at the same time,
+# sklearn's working_memory is shared between them
+TEMPORARIES = 8
+
+
+class MetricEnum(str, Enum):
+    COSINE = "cosine"
+    EUCLIDEAN = "euclidean"
+    MANHATTAN = "manhattan"
+
+
+def vectorize(texts: List[str], texts2: Optional[List[str]] = None, vectorizer_id: Optional[str] = None):
+    """TF-IDF rows of both lists as sparse matrices.
+
+    From the registered vectorizer ``vectorizer_id`` (see sklearn_api.vectorizers) if given,
+    else from one vectorizer fitted on all texts.
+    """
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    if vectorizer_id is not None:
+        vectors = get_store().transform(vectorizer_id, texts + (texts2 or []))
+    else:
+        vectors = TfidfVectorizer().fit_transform(texts + (texts2 or []))
+    if texts2 is None:
+        return vectors, vectors
+    return vectors[:len(texts)], vectors[len(texts):]
+
+
+def shared_minimum(x, y, budget: int) -> np.ndarray:
+    """Dense x by y matrix of ``sum(min(x_t, y_t))`` over the terms t both rows contain.
+
+    Only pairs of entries of the same term are visited, taken in groups of terms with about
+    ``budget`` pairs each, so the work is that of the sparse product ``x @ y.T``.
+    """
+    xc, yc = x.tocsc(), y.tocsc()
+    x_counts, y_counts = np.diff(xc.indptr), np.diff(yc.indptr)
+    pair_counts = x_counts * y_counts
+    pair_ends = np.cumsum(pair_counts)
+    result = np.zeros(x.shape[0] * y.shape[0])
+
+    first = 0
+    while first < len(pair_counts):
+        done = pair_ends[first] - pair_counts[first]
+        last = max(first + 1, int(np.searchsorted(pair_ends, done + budget, side="right")))
+        counts = pair_counts[first:last]
+        total = int(counts.sum())
+        if total:
+            terms = np.repeat(np.arange(first, last), counts)
+            within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            x_entries = xc.indptr[terms] + within // y_counts[terms]
+            y_entries = yc.indptr[terms] + within % y_counts[terms]
+            result += np.bincount(xc.indices[x_entries].astype(np.int64) * y.shape[0] + yc.indices[y_entries],
+                                  weights=np.minimum(xc.data[x_entries], yc.data[y_entries]),
+                                  minlength=len(result))
+        first = last
+    return result.reshape(x.shape[0], y.shape[0])
+
+
+def blocks(x, y, metric: MetricEnum) -> Iterator[Tuple[int, object]]:
+    """Yields ``(first row, values)`` for consecutive row blocks of the x by y matrix.
+
+    Blocks are sized so that ``TEMPORARIES`` arrays of their size fit into sklearn's
+    ``working_memory``. Cosine similarities are the sparse
+    product of the L2 normalized TF-IDF rows, only pairs sharing a term are stored. For
+    non-negative rows the Manhattan distance is ``|x| + |y| - 2 * sum(min(x_t, y_t))``, again
+    only summed over shared terms; other distances come from ``pairwise_distances_chunked``.
+    """
+    from sklearn import get_config
+    from sklearn.metrics import pairwise_distances_chunked
+
+    working_memory = get_config()["working_memory"] / TEMPORARIES
+    budget = int(max(1, working_memory * 2 ** 20 // 8))
+    n_rows = max(1, budget // max(y.shape[0], 1))
+    if metric == MetricEnum.COSINE:
+        for start in range(0, x.shape[0], n_rows):
+            yield start, (x[start:start + n_rows] @ y.T).tocsr()
+        return
+
+    if metric == MetricEnum.MANHATTAN and (x.nnz == 0 or x.data.min() >= 0) and (y.nnz == 0 or y.data.min() >= 0):
+        y_norms = np.asarray(y.sum(axis=1)).ravel()
+        for start in range(0, x.shape[0], n_rows):
+            block = x[start:start + n_rows]
+            distances = np.asarray(block.sum(axis=1)) + y_norms - 2 * shared_minimum(block, y, budget)
+            yield start, np.maximum(distances, 0, out=distances)
+        return
+
+    start = 0
+    for block in pairwise_distances_chunked(x, y, metric=metric.value, working_memory=working_memory):
+        yield start, block
+        start += block.shape[0]
+
+
+def _dense(values) -> np.ndarray:
+    return values.toarray() if hasattr(values, "toarray") else values
+
+
+def top_k(start: int, values, k: int, largest: bool, skip_self: bool,
+          threshold: Optional[float] = None) -> List[List[List[float]]]:
+    """``[column, value]`` of the k best values of every row of a block, best first."""
+    values = _dense(values)
+    keys = -values if largest else values.copy()
+    if threshold is not None:
+        keys[keys > (-threshold if largest else threshold)] = np.inf
+    if skip_self:
+        rows = np.arange(values.shape[0])
+        columns = rows + start
+        inside = columns < values.shape[1]
+        keys[rows[inside], columns[inside]] = np.inf
+
+    k = min(k, values.shape[1])
+    if k <= 0:
+        return [[] for _ in range(values.shape[0])]
+    best = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    best = np.take_along_axis(best, np.argsort(np.take_along_axis(keys, best, axis=1), axis=1, kind="stable"), axis=1)
+    return [
+        [[int(column), float(values[row, column])] for column in columns if np.isfinite(keys[row, column])]
+        for row, columns in enumerate(best)
+    ]
+
+
+def pairs(start: int, values, threshold: float, largest: bool, skip_self: bool) -> List[List[float]]:
+    """``[row, column, value]`` of the entries of a block at or above (cosine) or below (distances) the threshold."""
+    if hasattr(values, "tocoo") and largest and threshold > 0:
+        # entries missing from the sparse product are 0 and never pass
+        coo = values.tocoo()
+        rows, columns, data = coo.row, coo.col, coo.data
+        keep = data >= threshold
+    else:
+        values = _dense(values)
+        keep_matrix = values >= threshold if largest else values <= threshold
+        rows, columns = np.nonzero(keep_matrix)
+        data = values[rows, columns]
+        keep = np.ones(len(data), dtype=bool)
+    rows = rows + start
+    if skip_self:
+        keep &= rows != columns
+    return [[int(row), int(column), float(value)] for row, column, value in zip(rows[keep], columns[keep], data[keep])]
+
+
+def pairwise(texts: List[str],
+             texts2: Optional[List[str]] = None,
+             metric: MetricEnum = MetricEnum.COSINE,
+             k: Optional[int] = None,
+             threshold: Optional[float] = None,
+             vectorizer_id: Optional[str] = None) -> dict:
+    """Compares every text of ``texts`` with every text of ``texts2`` (or of ``texts`` itself).
+
+    Returns the top ``k`` columns per row if ``k`` is given, else the sparse ``[row, column, value]``
+    pairs passing ``threshold`` if that is given, else the whole matrix. When a list is
+    compared with itself, a text is not reported as its own neighbour in ``topK`` and
+    ``pairs``; the whole matrix keeps its diagonal.
+    """
+    metric = MetricEnum(metric)
+    x, y = vectorize(texts, texts2, vectorizer_id)
+    largest = metric == MetricEnum.COSINE
+    skip_self = texts2 is None
+    result = {"metric": metric.value, "shape": [x.shape[0], y.shape[0]]}
+
+    if k is not None:
+        result["topK"] = [row for start, values in blocks(x, y, metric)
+                          for row in top_k(start, values, k, largest, skip_self, threshold)]
+    elif threshold is not None:
+        result["pairs"] = [pair for start, values in blocks(x, y, metric)
+                           for pair in pairs(start, values, threshold, largest, skip_self)]
+    else:
+        result["matrix"] = [row for _, values in blocks(x, y, metric) for row in _dense(values).tolist()]
+    return result
+
+
+def pair_value(text: str, text2: str, metric: MetricEnum, vectorizer_id: str) -> float:
+    """Cosine similarity or distance of two texts under a registered vectorizer: one transform, one sparse product."""
+    vectors = get_store().transform(vectorizer_id, [text, text2])
+    x, y = vectors[0], vectors[1]
+    if metric == MetricEnum.COSINE:
+        norms = np.sqrt(x.multiply(x).sum() * y.multiply(y).sum())
+        return float(x.multiply(y).sum() / norms) if norms else float("nan")
+    difference = x - y
+    if metric == MetricEnum.EUCLIDEAN:
+        return float(np.sqrt(difference.multiply(difference).sum()))
+    return float(abs(difference).sum())
@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List
+
+from util.utils import data_dir
+
+# id of the stateless HashingVectorizer, usable without registering anything
+HASHING_ID = "hashing"
+# limit of n_features; a HashingVectorizer's IDF weights take 8 * n_features bytes
+MAX_FEATURES = 2 ** 24
+
+
+def hashing_vectorizer(n_features: int = 2 ** 20):
+    """Stateless term vectors: terms are hashed to columns, no vocabulary to look up or store.
+
+    Counts are not sign-flipped, so the rows stay non-negative like TF-IDF rows, and are L2 normalized.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(n_features=n_features, alternate_sign=False, norm="l2")
+
+
+class VectorizerStore:
+    """Vectorizers fitted once on a reference corpus, persisted by id and shared by all workers.
+
+    A vectorizer is either a TfidfVectorizer or, with ``hashing``, a HashingVectorizer followed
+    by a TfidfTransformer, whose IDF weights need no vocabulary. It is stored as
+    ``<id>.joblib`` (uncompressed, so its NumPy arrays are memory-mapped on load) and
+    ``<id>.json`` (metadata, written last). The id is derived from the corpus and options,
+    so fitting the same corpus twice returns the same id. Loaded vectorizers are cached per
+    process, keyed by the mtime of the metadata file.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectorizers = {}
+        self._lock = threading.Lock()
+
+    def _path(self, vectorizer_id: str, suffix: str) -> str:
+        if not vectorizer_id.isalnum():
+            raise KeyError(vectorizer_id)
+        return os.path.join(self.directory, f"{vectorizer_id}.{suffix}")
+
+    def register(self, texts: List[str], hashing: bool = False, n_features: int = 2 ** 20) -> dict:
+        import joblib
+        from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+        from sklearn.pipeline import make_pipeline
+
+        if not 1 <= n_features <= MAX_FEATURES:
+            raise ValueError(f"n_features must be between 1 and {MAX_FEATURES}")
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(f"{hashing}:{n_features}\n".encode("utf-8"))
+        for text in texts:
+            digest.update(text.encode("utf-8") + b"\0")
+        vectorizer_id = digest.hexdigest()
+
+        if os.path.exists(self._path(vectorizer_id, "json")):
+            return self.info(vectorizer_id)
+
+        if hashing:
+            vectorizer = make_pipeline(hashing_vectorizer(n_features), TfidfTransformer()).fit(texts)
+            features = n_features
+        else:
+            vectorizer = TfidfVectorizer().fit(texts)
+            features = len(vectorizer.vocabulary_)
+
+        info = {"id": vectorizer_id, "hashing": hashing, "documents": len(texts), "features": features, "createdAt": time.time()}
+        with self._temporary() as tmp_path:
+            joblib.dump(vectorizer, tmp_path)
+            os.replace(tmp_path, self._path(vectorizer_id, "joblib"))
+        with self._temporary() as tmp_path:
+            with open(tmp_path, "w") as f:
+                json.dump(info, f)
+            # written last, marks a complete vectorizer
+            os.replace(tmp_path, self._path(vectorizer_id, "json"))
+        with self._lock:
+            self.vectorizers[vectorizer_id] = (self._modified(vectorizer_id), vectorizer)
+        return info
+
+    @contextmanager
+    def _temporary(self):
+        """Path of a new, uniquely named file in the store directory, removed unless it was moved away."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            yield tmp_path
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def info(self, vectorizer_id: str) -> dict:
+        if vectorizer_id == HASHING_ID:
+            return {"id": HASHING_ID, "hashing": True, "documents": 0, "features": 2 ** 20, "createdAt": None}
+        try:
+            with open(self._path(vectorizer_id, "json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(vectorizer_id)
+
+    def _modified(self, vectorizer_id: str) -> float:
+        if vectorizer_id == HASHING_ID:
+            return 0.0
+        try:
+            return os.stat(self._path(vectorizer_id, "json")).st_mtime
+        except FileNotFoundError:
+            raise KeyError(vectorizer_id)
+
+    def get(self, vectorizer_id: str):
+        # the metadata file is checked on every call, so a vectorizer deleted (or registered
+        # again) by another worker is not served from this worker's cache
+        try:
+            modified = self._modified(vectorizer_id)
+        except KeyError:
+            with self._lock:
+                self.vectorizers.pop(vectorizer_id, None)
+            raise
+        with self._lock:
+            cached = self.vectorizers.get(vectorizer_id)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+        if vectorizer_id == HASHING_ID:
+            vectorizer = hashing_vectorizer()
+        else:
+            import joblib
+
+            vectorizer = joblib.load(self._path(vectorizer_id, "joblib"), mmap_mode="r")
+        with self._lock:
+            self.vectorizers[vectorizer_id] = (modified, vectorizer)
+        return vectorizer
+
+    def delete(self, vectorizer_id: str) -> dict:
+        if vectorizer_id == HASHING_ID:
+            raise KeyError(vectorizer_id)
+        info = self.info(vectorizer_id)
+        with self._lock:
+            self.vectorizers.pop(vectorizer_id, None)
+        for suffix in ("json", "joblib"):
+            try:
+                os.remove(self._path(vectorizer_id, suffix))
+            except FileNotFoundError:
+                pass
+        return info
+
+    def transform(self, vectorizer_id: str, texts: List[str]):
+        """Sparse, L2 normalized rows of the texts."""
+        return self.get(vectorizer_id).transform(texts)
+
+
+@lru_cache(maxsize=1)
+def get_store() -> VectorizerStore:
+    return VectorizerStore(data_dir("vectorizers"))
+
+
+def register(texts: List[str], hashing: bool = False, n_features: int = 2 ** 20) -> dict:
+    return get_store().register(texts, hashing, n_features)
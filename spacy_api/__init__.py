@@ -1,18 +1,22 @@
 import json
-import re
-from collections import Counter
-from heapq import nlargest
-from string import punctuation
-from typing import Optional, List
+from enum import Enum
+from typing import Any, Dict, List, Optional, Union
 
-import phonenumbers
 from fastapi import APIRouter
-from fastapi import Form
-from spacy.lang.en import STOP_WORDS
+from fastapi import File, Form, HTTPException, Query, Request, UploadFile
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
-from util.utils import LangEnum, SpacySingleton
+from spacy_api.extractors import EXTRACTORS, MAX_BATCH_SIZE, check_params, run_batch, run_extractor, run_extractors, run_extractors_batch
+from spacy_api.frequencies import MAX_CAPACITY, MAX_CHUNK_SIZE, MAX_DEPTH, MAX_WIDTH, count_terms
+from spacy_api.gazetteers import get_store
+from spacy_api.summarization import summarize_batch
+from util.executor import execute
+from util.profiling import ProfilingRoute
+from util.streaming import NDJSONStreamingResponse, iter_batches, iter_lines, ndjson_line, parse_record
+from util.utils import LangEnum
 
-router = APIRouter()
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/address_extraction/",
              summary="Extract address using regex",
@@ -32,34 +36,7 @@ def address_extraction(text: Optional[str] = Form("I live at 35 Wood Lane, Pilsb
                        # files: Optional[List[UploadFile]] = File(None)
                        ):
 
-    addresses = []
-    if text:
-        nlp = SpacySingleton.get_nlp(lang)
-
-        doc = nlp(text)
-
-        regex_1 = re.compile(
-            r"(?:\d{1,5}(?:[A-Z ]+[ ]?)+(?:[A-Za-z-]+[ ]?)+(?:Avenue|Lane|Road|Boulevard|Drive|Street|Ave|Dr(?:\.)?|Rd(?:\.)?|Blvd(?:\.)?|Ln(?:\.)?|St(?:\.)?|Strasse|Hill|Alley|Alle|City)[,](?:[ A-Za-z0-9,]+[ ]?)?)"
-        )
-        regex_2 = re.compile(
-            r"(?:(?:[A-Za-z-]?)+[ ](?:Avenue|Lane|Road|Boulevard|Drive|Street|Ave|Dr(?:\.)?|Rd(?:\.)?|Blvd(?:\.)?|Ln(?:\.)?|St(?:\.)?|Strasse|Str(?:\.)?|Hill|Alley|Alle|City)[ ]+\d{1,5},(?:[ A-Za-z0-9,]+[ ]?)?)"
-        )
-
-        if regex_1.findall(text):
-            for match in regex_1.finditer(text):
-                start, end = match.span()
-                print(start, end)
-                span = doc.char_span(start, end, alignment_mode="expand")
-                print(span)
-                addresses.append(["address", span.start, span.end, span.text])
-        if regex_2.findall(text):
-            for match in regex_2.finditer(text):
-                start, end = match.span()
-                span = doc.char_span(start, end, alignment_mode="expand")
-                print(span)
-                addresses.append(["address", span.start, span.end])
-
-    return {"addresses": addresses}
+    return execute(run_extractor, "address", lang, text)
 
 
 @router.post("/color_code_extraction/",
@@ -74,25 +51,7 @@ def address_extraction(text: Optional[str] = Form("I live at 35 Wood Lane, Pilsb
 def color_code_extraction(text: Optional[str] = Form("There are more than 42 #colors you could use in CSS, e.g. #ff00ff, hsl(0, 0%, 0%), or rgba(255, 0, 0, 0.3) if you want to use alpha values."),
                           lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-
-    color_codes = []
-    if text:
-        nlp = SpacySingleton.get_nlp(lang)
-        doc = nlp(text)
-
-        # https://developer.mozilla.org/en-US/docs/Web/CSS/color_value
-        hexcolor_regex = re.compile(r"#([0-9a-fA-F]{8}|[0-9a-fA-F]{6}|[0-9a-fA-F]{4}|[0-9a-fA-F]{3})(?![0-9a-fA-F])")
-        rgb_regex = re.compile(r"(rgba|rgb)\([^\)]*\)")
-        hsl_regex = re.compile(r"(hsla|hsl)\([^\)]*\)")
-        hwb_regex = re.compile(r"hwb\([^\)]*\)")
-
-        for regex in [hexcolor_regex, rgb_regex, hsl_regex, hwb_regex]:
-            for match in regex.finditer(text):
-                start, end = match.span()
-                span = doc.char_span(start, end, alignment_mode="expand")
-                color_codes.append(["color", span.start, span.end])
-
-    return {"extractedColorCodes": color_codes}
+    return execute(run_extractor, "color_code", lang, text)
 
 
 @router.post("/date_extraction/",
@@ -110,20 +69,7 @@ def color_code_extraction(text: Optional[str] = Form("There are more than 42 #co
 def date_extraction(text: Optional[str] = Form("Today is 04.11.2022. Yesterday was 03/11/2022. Tomorrow is 05-11-2022. Day after tomorrow is 6 Nov 2022."),
                     lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    dates = []
-    if text:
-        nlp = SpacySingleton.get_nlp(lang)
-        doc = nlp(text)
-        regex = re.compile(
-            r"(?:[0-9]{1,2}|[0-9]{4}|Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)[\/\. -]{1}(?:[0-9]{1,2}|Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)[,\/\. -]{1}(?:[0-9]{2,4})"
-        )
-
-        for match in regex.finditer(text):
-            start, end = match.span()
-            span = doc.char_span(start, end, alignment_mode="expand")
-            dates.append(["date", span.start, span.end])
-
-    return {"dates": dates}
+    return execute(run_extractor, "date", lang, text)
 
 
 @router.post("/time_extraction/",
@@ -138,24 +84,16 @@ def date_extraction(text: Optional[str] = Form("Today is 04.11.2022. Yesterday w
 def time_extraction(text: Optional[str] = Form("Right now it is 14:40:37. Three hours ago it was 11:40 am. Two hours and twenty mins from now it will be 5PM."),
                     lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    times = []
-    if text:
-        nlp = SpacySingleton.get_nlp(lang)
-        doc = nlp(text)
-        regex = re.compile(
-            r"\b(1[0-2]|[1-9])\s*[apAP][. ]*[mM]\.?|(?:(?:[01]?[0-9]|2[0-3]):[0-5][0-9](?::[0-5][0-9])?(?:(?:\s?[ap](?:\.m\.)?)|(?:\s?[AP](?:\.M\.)?)))|(?:[01]?[0-9]|2[0-3]):[0-5][0-9](?::[0-5][0-9])?"
-        )
-
-        for match in regex.finditer(text):
-            start, end = match.span()
-            span = doc.char_span(start, end, alignment_mode="expand")
-            times.append(["time", span.start, span.end])
+    return execute(run_extractor, "time", lang, text)
 
 
 @router.post("/gazetteer_extraction/",
              summary="Detects full entities in a text based on some hints.",
              description=
              """
+             With a `gazetteer_id` (see `/gazetteers/`) the entries of that gazetteer are matched
+             in the text instead of comparing the noun chunks with `lookup_values`.
+
              ## Examples:
              - Max Mustermann decided to join Kern AI, where he wants to build great software.
              - fr
@@ -164,19 +102,57 @@ def time_extraction(text: Optional[str] = Form("Right now it is 14:40:37. Three
 def gazetteer_extraction(text: Optional[str] = Form("Max Mustermann decided to join Kern AI, where he wants to build great software."),
                          lang: Optional[LangEnum] = Form(LangEnum.EN),
                          lookup_values: List[str] = Form(["Max", "Leon", "Kai", "Aaron"]),
-                         your_label: str = Form("person")):
+                         your_label: str = Form("person"),
+                         gazetteer_id: Optional[str] = Form(None)):
+
+    if gazetteer_id:
+        params = _check_params(["registered_gazetteer"],
+                               {"registered_gazetteer": {"gazetteer_id": gazetteer_id, "your_label": your_label}})
+        return execute(run_extractor, "registered_gazetteer", lang, text, **params["registered_gazetteer"])
+    return execute(run_extractor, "gazetteer", lang, text, lookup_values=lookup_values, your_label=your_label)
+
+
+@router.post("/gazetteers/",
+             summary="Registers a gazetteer for the gazetteer extraction.",
+             description=
+             """
+             Upload the entries as a text file with one entry per line, or pass them as `entries`.
+             The gazetteer is compiled into a keyword automaton and stored; the returned `id` is
+             passed as `gazetteer_id` to `/gazetteer_extraction/`. Registering the same entries
+             again returns the same id.
+
+             ## Examples:
+             - Max Mustermann, Leon Kai, Aaron
+             """)
+def register_gazetteer(file: Optional[UploadFile] = File(None),
+                       entries: Optional[List[str]] = Form(None),
+                       case_sensitive: bool = Form(False)):
+
+    values = list(entries or [])
+    if file is not None:
+        try:
+            values.extend(line.decode("utf-8") for line in file.file)
+        except UnicodeDecodeError as e:
+            raise HTTPException(status_code=422, detail=f"Gazetteer file is not UTF-8 encoded: {e}")
+    if not values:
+        raise HTTPException(status_code=422, detail="No gazetteer entries given")
+    return get_store().register(values, case_sensitive=case_sensitive)
+
+
+@router.get("/gazetteers/{gazetteer_id}", summary="Returns the metadata of a registered gazetteer.")
+def gazetteer_info(gazetteer_id: str):
+    try:
+        return get_store().info(gazetteer_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown gazetteer {gazetteer_id}")
 
-    """Detects full entities in a text based on some hints."""
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    matches = []
 
-    for chunk in doc.noun_chunks:
-        if any(
-                [chunk.text in trie or trie in chunk.text for trie in lookup_values]
-        ):
-            yield your_label, chunk.start, chunk.end
-    return {f"{your_label}s": matches}
+@router.delete("/gazetteers/{gazetteer_id}", summary="Deletes a registered gazetteer.")
+def delete_gazetteer(gazetteer_id: str):
+    try:
+        return get_store().delete(gazetteer_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown gazetteer {gazetteer_id}")
 
 
 @router.post("/regex_extraction/",
@@ -193,39 +169,16 @@ def regex_extraction(text: Optional[str] = Form("Check out https://kern.ai!"),
                          regex: str = Form("https:\/\/[a-zA-Z0-9.\/]+"),
                          your_label: str = Form("url")):
 
-    """Detects regex matches in a given text."""
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    matches = []
-
-    def regex_search(pattern, string):
-        """
-        some helper function to easily iterate over regex matches
-        """
-        prev_end = 0
-        while True:
-            match = re.search(pattern, string)
-            if not match:
-                break
-
-            start, end = match.span()
-            yield start + prev_end, end + prev_end
-
-            prev_end += end
-            string = string[end:]
-
-    for start, end in regex_search(regex, text):
-        span = doc.char_span(start, end, alignment_mode="expand")
-        matches.append([your_label, span.start, span.end])
-
-    return {f"{your_label}s": matches}
+    return execute(run_extractor, "regex", lang, text, regex=regex, your_label=your_label)
 
 
 @router.post("/window_search_extraction/",
              summary="Searches for a given list of words in a given text and returns the surrounding noun chunks.",
              description=
              """
+             The terms are searched once per text and looked up per noun chunk window. For many
+             texts use `/batch_extraction/` with `{"extractor": "window_search", "params": {...}}`.
+
              ## Examples:
              - Max Mustermann decided to join Kern AI, where he wants to build great software.
              - fr
@@ -234,21 +187,10 @@ def regex_extraction(text: Optional[str] = Form("Check out https://kern.ai!"),
 def window_search_extraction(text: Optional[str] = Form("Max Mustermann decided to join Kern AI, where he wants to build great software."),
                              lang: Optional[LangEnum] = Form(LangEnum.EN),
                              lookup_values: List[str] = Form(["join", "works at", "is employed by"]),
-                             window_size: str = Form(6),
+                             window_size: int = Form(6),
                              your_label: str = Form("person")):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    matches = []
-    for chunk in doc.noun_chunks:
-        left_bound = max(chunk.sent.start, chunk.start - (window_size // 2) + 1)
-        right_bound = min(chunk.sent.end, chunk.end + (window_size // 2) + 1)
-        window_doc = doc[left_bound:right_bound]
-        if any([term in window_doc.text for term in lookup_values]):
-            matches.append([your_label, chunk.start, chunk.end])
-
-    return {f"{your_label}s": matches}
+    return execute(run_extractor, "window_search", lang, text, lookup_values=lookup_values, window_size=window_size, your_label=your_label)
 
 
 @router.post("/work_of_art_extraction/",
@@ -263,15 +205,7 @@ def window_search_extraction(text: Optional[str] = Form("Max Mustermann decided
 def work_of_art_extraction(text: Optional[str] = Form('The bestseller of last month is "Mystery of the Floridian Porter" by John Doe.'),
                            lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    found = []
-
-    for entity in doc.ents:
-        if entity.label_ == "WORK_OF_ART":
-            found.append(["work of art", entity.start, entity.end])
-
-    return {"works of art": found}
+    return execute(run_extractor, "work_of_art", lang, text)
 
 
 @router.post("/bic_extraction/",
@@ -286,15 +220,7 @@ def work_of_art_extraction(text: Optional[str] = Form('The bestseller of last mo
 def bic_extraction(text: Optional[str] = Form('My BIC number is COBADEBBXXX'),
                    lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    regex = re.compile(r'\b[A-Z0-9]{4,4}[A-Z]{2,2}[A-Z2-9][A-NP-Z0-9]([X]{3,3}|[A-WY-Z0-9]{1,1}[A-Z0-9]{2,2}|\s|\W|$)')
-    bic = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        bic.append(["BIC", span.start, span.end])
-    return {"bic": bic}
+    return execute(run_extractor, "bic", lang, text)
 
 
 @router.post("/credit_card_extraction/",
@@ -306,20 +232,10 @@ def bic_extraction(text: Optional[str] = Form('My BIC number is COBADEBBXXX'),
              - fr
              - la
              """)
-def bic_extraction(text: Optional[str] = Form('This is my card details please use it carefully 4569-4039-6101-4710.'),
+def credit_card_extraction(text: Optional[str] = Form('This is my card details please use it carefully 4569-4039-6101-4710.'),
                    lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    regex = re.compile(r"(\d{4}[-\s]?){3}\d{3,4}")
-
-    credit = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        credit.append([span.start, span.end, span.text])
-
-    return {"creditCard": credit}
+    return execute(run_extractor, "credit_card", lang, text)
 
 
 @router.post("/digit_extraction/",
@@ -335,16 +251,7 @@ def digit_extraction(text: Optional[str] = Form('My PIN is 1337.'),
                      lang: Optional[LangEnum] = Form(LangEnum.EN),
                      digit_length: int = Form(4)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    num_string = "{"+f"{digit_length}"+"}"
-    regex = re.compile(rf"(?<![0-9])[0-9]{num_string}(?![0-9])")
-
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        return {"Number": [span.start, span.end]}
+    return execute(run_extractor, "digit", lang, text, digit_length=digit_length)
 
 
 @router.post("/iban_extraction/",
@@ -358,18 +265,8 @@ def digit_extraction(text: Optional[str] = Form('My PIN is 1337.'),
              """)
 def iban_extraction(text: Optional[str] = Form('DE89370400440532013000'),
                      lang: Optional[LangEnum] = Form(LangEnum.EN)):
-    """Extracts IBAN from text"""
-
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    regex = re.compile(r"[A-Z]{2}\d{2} ?\d{4} ?\d{4} ?\d{4} ?\d{4} ?[\d]{0,2}")
 
-    isbn = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        isbn.append(["IBAN", span.start, span.end])
-    return {"iban": isbn}
+    return execute(run_extractor, "iban", lang, text)
 
 
 @router.post("/ip_extraction/",
@@ -381,20 +278,10 @@ def iban_extraction(text: Optional[str] = Form('DE89370400440532013000'),
              - fr
              - la
              """)
-def iban_extraction(text: Optional[str] = Form('The IP addressing range is from 0.0.0.0 to 255.255.255.255'),
+def ip_extraction(text: Optional[str] = Form('The IP addressing range is from 0.0.0.0 to 255.255.255.255'),
                     lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    regex = re.compile(r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b")
-
-    ip_addresses = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        ip_addresses.append(["ip_address", span.start, span.end])
-
-    return {"ip_addresses": ip_addresses}
+    return execute(run_extractor, "ip", lang, text)
 
 
 @router.post("/percentage_extraction/",
@@ -409,15 +296,7 @@ def iban_extraction(text: Optional[str] = Form('The IP addressing range is from
 def percentage_extraction(text: Optional[str] = Form('percentages 110% are found -.5% at 42,13% positions 1, 5 and 8'),
                           lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    regex = re.compile(r"(-?\d+(?:[.,]\d*)?|-?[.,]\d+)\s*%")
-    percentages = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        percentages.append(["percentage", span.start, span.end])
-    return {"percentages": percentages}
+    return execute(run_extractor, "percentage", lang, text)
 
 
 @router.post("/phone_number_extraction/",
@@ -432,24 +311,7 @@ def percentage_extraction(text: Optional[str] = Form('percentages 110% are found
 def phone_number_extraction(text: Optional[str] = Form('So heres my number +442083661177. Call me maybe!'),
                             lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    regex = re.compile(r"[\+]?[(]?[0-9]{3}[)]?[-\s\.]?[0-9]{3}[-\s\.]?[0-9]{4,6}")
-    regex.findall(text)
-
-    valid_numbers = []
-    for match in regex.finditer(text):
-        try:
-            parsed_num = phonenumbers.parse(match.group(0), None)
-            if phonenumbers.is_valid_number(parsed_num):
-                start, end = match.span()
-                span = doc.char_span(start, end)
-                valid_numbers.append(["phoneNumber", span.start, span.end])
-        except phonenumbers.phonenumberutil.NumberParseException:
-            pass
-
-    return {"phoneNumbers": valid_numbers}
+    return execute(run_extractor, "phone_number", lang, text)
 
 
 @router.post("/price_extraction/",
@@ -464,15 +326,7 @@ def phone_number_extraction(text: Optional[str] = Form('So heres my number +4420
 def price_extraction(text: Optional[str] = Form('A desktop with i7 processor costs 950 dollars in the US.'),
                      lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    prices = []
-    for entity in doc.ents:
-        if entity.label_ == "MONEY":
-            prices.append(["price", entity.start, entity.end])
-
-    return {"prices": prices}
+    return execute(run_extractor, "price", lang, text)
 
 
 @router.post("/filepath_extraction/",
@@ -489,27 +343,7 @@ def filepath_extraction(text: Optional[str] = Form('My favourite file is stored
                         separator: str = Form("/"),
                         your_label: str = Form("path")):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    # Extracts the paths from the texts
-    paths = [x for x in text.split() if len(x.split(separator)) > 1]
-
-    # We need to add an \ before separators to use them in regex
-    regex_paths = [i.replace(separator, "\\"+separator) for i in paths]
-    print(regex_paths)
-
-    matches = []
-    for path in regex_paths:
-        pattern = rf"({path})"
-        match = re.search(pattern, text)
-
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-
-        matches.append([your_label, span.start, span.end])
-
-    return {f"{your_label}s": matches}
+    return execute(run_extractor, "filepath", lang, text, separator=separator, your_label=your_label)
 
 
 @router.post("/url_extraction/",
@@ -524,19 +358,7 @@ def filepath_extraction(text: Optional[str] = Form('My favourite file is stored
 def url_extraction(text: Optional[str] = Form('Check out https://kern.ai!'),
                    lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    regex_pattern = re.compile(r"(?:(?:(?:https?|ftp):\/\/){1})?[\w\-\/?=%.]{3,}\.[\/\w\-&?=%.]{2,}")
-    regex_pattern.findall(text)
-
-    urls = []
-    for match in regex_pattern.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        urls.append(["url", span.start, span.end])
-
-    return {"urls": urls}
+    return execute(run_extractor, "url", lang, text)
 
 
 @router.post("/email_extraction/",
@@ -551,17 +373,7 @@ def url_extraction(text: Optional[str] = Form('Check out https://kern.ai!'),
 def email_extraction(text: Optional[str] = Form('If you have any questions, please contact johannes.hoetter@kern.ai.'),
                      lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    regex = re.compile(r"([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+\.[a-zA-Z0-9_-]+)")
-
-    emails = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        emails.append(["email", span.start, span.end])
-
-    return {"emails": emails}
+    return execute(run_extractor, "email", lang, text)
 
 
 @router.post("/location_extraction/",
@@ -576,14 +388,7 @@ def email_extraction(text: Optional[str] = Form('If you have any questions, plea
 def location_extraction(text: Optional[str] = Form('Tokyo is a beautiful city, which is not located in Kansas, USA.'),
                         lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    names = []
-    for ent in doc.ents:
-        if ent.label_ == "GPE" or ent.label_ == "LOC":
-            names.append(["location", ent.start, ent.end])
-    return {"locations": names}
+    return execute(run_extractor, "location", lang, text)
 
 
 @router.post("/person_extraction/",
@@ -598,23 +403,8 @@ def location_extraction(text: Optional[str] = Form('Tokyo is a beautiful city, w
 def person_extraction(text: Optional[str] = Form('John Doe worked with Jane Doe and now they are together.'),
                       lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    names = []
-
-    for entity in doc.ents:
-        if entity.label_ == "PERSON":
-            names.append(["person", entity.start, entity.end])
-    # "name" will contain all the occurrences of a particular name.
-    # This is because spacy treats each word in a text as a unique vector.
-    # So, two occurrences of "Div" does not mean "Div" == "Div"!
-    names = {"names": names}
+    return execute(run_extractor, "person", lang, text)
 
-    return names
-
-# Load JSON file with all zip code regex patterns
-with open('spacy_api/zip_codes.json') as f:
-    zip_codes_json = json.load(f)
 
 @router.post("/zipcode_extraction/",
              summary="Extracts a zipcode from a string using regex.",
@@ -629,18 +419,7 @@ def zipcode_extraction(text: Optional[str] = Form('10 Downing Street London SW1A
                        lang: Optional[LangEnum] = Form(LangEnum.EN),
                        country_id: str = Form("GB")):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    match = re.search(zip_codes_json[country_id], text)
-
-    try:
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-    except AttributeError:
-        return "No zipcodes found"
-
-    return {country_id: ["zipcode", span.start, span.end]}
+    return execute(run_extractor, "zipcode", lang, text, country_id=country_id)
 
 
 @router.post("/hashtag_extraction/",
@@ -655,18 +434,7 @@ def zipcode_extraction(text: Optional[str] = Form('10 Downing Street London SW1A
 def hashtag_extraction(text: Optional[str] = Form('In tech industry, #devrel is a very hot topic.'),
                        lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    regex = re.compile(r"#(\w*)")
-    regex.findall(text)
-
-    hashtags = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        hashtags.append(["hashtag", span.start, span.end])
-
-    return {"hashtags": hashtags}
+    return execute(run_extractor, "hashtag", lang, text)
 
 
 @router.post("/noun_match_extraction/",
@@ -681,42 +449,7 @@ def hashtag_extraction(text: Optional[str] = Form('In tech industry, #devrel is
 def noun_match_extraction(text: Optional[str] = Form('Leo likes tasty pizza. Mary loves delicious cake. And Moritz loves tasty bread.'),
                           lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    """Extracts all similar noun chunks from a text"""
-    # instantiate empty lists to store already encountered words and for found matches
-    word_repo = []
-    matches = []
-
-    # get noun chunks from spacy
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text.lower())
-    nc = [i.text.lower() for i in doc.noun_chunks]
-
-    # loop through all noun chunks
-    for noun_chunk in nc:
-        print(noun_chunk)
-        # if noun chunk has more than one word, take first word as a target word
-        if len(noun_chunk.split()) >= 2:
-            target_word = noun_chunk.split()[0]
-
-            # if target word has been used before, stop process
-            if target_word in word_repo:
-                pass
-            else:
-                # pass word to repository to avoid duplicate use
-                word_repo.append(target_word)
-
-                # create regex_pattern with target word
-                pattern = rf"\W*({target_word})\W*([^\s]+)"
-
-                # extract the spans of all found matches
-                for item in re.finditer(pattern, text):
-                    start, end = item.span()
-                    span = doc.char_span(start, end, alignment_mode="expand")
-                    matches.append(["match", span.start, span.end])
-        else:
-            pass
-
-    return {"quote": matches}
+    return execute(run_extractor, "noun_match", lang, text)
 
 
 @router.post("/org_extraction/",
@@ -731,16 +464,7 @@ def noun_match_extraction(text: Optional[str] = Form('Leo likes tasty pizza. Mar
 def org_extraction(text: Optional[str] = Form('We are developers from Kern.ai.'),
                    lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    organisations = []
-
-    for entity in doc.ents:
-        if entity.label_ == "ORG":
-            organisations.append(["org", entity.start, entity.end])
-
-    return {"organisations": organisations}
+    return execute(run_extractor, "org", lang, text)
 
 
 @router.post("/part_of_speech_extraction/",
@@ -755,20 +479,7 @@ def org_extraction(text: Optional[str] = Form('We are developers from Kern.ai.')
 def part_of_speech_extraction(text: Optional[str] = Form('My favourite british tea is Yorkshire tea.'),
                               lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    pos_tags = []
-    for token in doc:
-        pos = token.pos_
-
-        start, end = token.i, token.i +1
-        span = doc.char_span(start, end, alignment_mode="expand")
-
-        pos_tags.append([pos, span.start, span.end])
-
-    return {"POS tags": pos_tags}
-
+    return execute(run_extractor, "part_of_speech", lang, text)
 
 
 @router.post("/quote_extraction/",
@@ -789,17 +500,7 @@ def quote_extraction(text: Optional[str] = Form('''"Hello, Nick," said Harry.
                                                 "So do you," said Harry.'''),
                    lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    regex = re.compile(r'\"(.+?)"|\'(.*?)\'')
-
-    quotes = []
-    for match in regex.finditer(text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        quotes.append(["quote", span.start, span.end])
-
-    return {"quote": quotes}
+    return execute(run_extractor, "quote", lang, text)
 
 
 @router.post("/substring_extraction/",
@@ -815,17 +516,7 @@ def substring_extraction(text: Optional[str] = Form('Hello this is my flat. This
                          lang: Optional[LangEnum] = Form(LangEnum.EN),
                          substring: str = Form("This is a duplicate.")):
 
-    start_index = text.find(substring)
-    end_index = start_index + len(substring)
-
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    if start_index != -1:
-        span = doc.char_span(start_index, end_index, alignment_mode="expand")
-        return {"Substring": [span.start, span.end]}
-    else:
-        return "No substring found!"
+    return execute(run_extractor, "substring", lang, text, substring=substring)
 
 
 @router.post("/spacy_lemmatizer/",
@@ -840,16 +531,7 @@ def substring_extraction(text: Optional[str] = Form('Hello this is my flat. This
 def spacy_lemmatizer(text: Optional[str] = Form('Hello, I am talking about coding at Kern AI!'),
                      lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    final_text = ""
-    for i, token in enumerate(doc):
-        if i > 0:
-            diff = token.idx - (doc[i - 1].idx + len(doc[i - 1]))
-            if diff > 0:
-                final_text += " " * diff
-        final_text += token.lemma_
-    return {"lemmatized_text": final_text}
+    return execute(run_extractor, "lemmatizer", lang, text)
 
 
 @router.post("/noun_splitter/",
@@ -864,16 +546,7 @@ def spacy_lemmatizer(text: Optional[str] = Form('Hello, I am talking about codin
 def noun_splitter(text: Optional[str] = Form("My favorite noun is 'friend'."),
                   lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-
-    nouns_sents = set()
-    for sent in doc.sents:
-        for token in sent:
-            if token.pos_ == "NOUN" and len(token.text) > 1:
-                nouns_sents.add(token.text)
-
-    return {"nouns": list(nouns_sents)}
+    return execute(run_extractor, "noun_splitter", lang, text)
 
 
 @router.post("/text_summarization/",
@@ -887,51 +560,44 @@ def noun_splitter(text: Optional[str] = Form("My favorite noun is 'friend'."),
                loathe anything that put him out of his comfort zone.
              - fr
              - la
-             
-             ## TODO:
-             - add latin stopwords
              """)
 def text_summarization(text: Optional[str] = Form("""There was a time when he would have embraced the change that was coming. In his youth, he sought 
                                                     adventure and the unknown, but that had been years ago. He wished he could go back and learn to find the 
                                                     excitement that came with change but it was useless. That curiosity had long left him to where he had come to 
                                                     loathe anything that put him out of his comfort zone."""),
                        lang: Optional[LangEnum] = Form(LangEnum.EN),
-                       length: float = Form(0.5)):
-
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
-    word_count = {}
+                       length: float = Form(0.5, ge=0, le=1)):
 
-    for word in doc:
-        if word.text.lower() not in list(STOP_WORDS):
-            if word.text.lower() not in punctuation:
-                if word.text not in word_count.keys():
-                    word_count[word.text] = 1
-                else:
-                    word_count[word.text] += 1
+    return execute(run_extractor, "text_summarization", lang, text, length=length)
 
-    maximum_count = max(word_count.values())
 
-    for word in word_count.keys():
-        word_count[word] = word_count[word] / maximum_count
+class SummarizationBatchRequest(BaseModel):
+    documents: List[Union[str, List[str]]]
+    lang: LangEnum = LangEnum.EN
+    length: float = Field(0.5, ge=0, le=1)
+    batch_size: int = Field(64, ge=1, le=MAX_BATCH_SIZE)
 
-    sentence_tokens = [sent for sent in doc.sents]
-    sentence_scores = {}
 
-    for sent in sentence_tokens:
-        for word in sent:
-            if word.text.lower() in word_count.keys():
-                if sent not in sentence_scores.keys():
-                    sentence_scores[sent] = word_count[word.text.lower()]
-                else:
-                    sentence_scores[sent] += word_count[word.text.lower()]
+@router.post("/text_summarization_batch/",
+             summary="Generates the summaries of many texts.",
+             description=
+             """
+             A document is either a text or the list of its consecutive chunks (e.g. the chapters of a
+             book, split at sentence boundaries); chunked documents are parsed and scored `batch_size`
+             chunks at a time. `length` is the share of the sentences kept. Results are returned in input order.
 
-    size = int(len(sentence_tokens) * length)
-    extracted_sentences = nlargest(size, sentence_scores, key=sentence_scores.get)
-    summarise = [word.text for word in extracted_sentences]
-    summary = " ".join(summarise)
+             ## Examples:
+             - {"documents": ["He sought adventure. That had been years ago.", ["Chapter one ends here.", "Chapter two starts."]]}
+             """)
+def text_summarization_batch(request: SummarizationBatchRequest):
 
-    return {"summary": summary}
+    return {
+        "results": execute(summarize_batch,
+                           request.lang,
+                           request.documents,
+                           request.length,
+                           request.batch_size)
+    }
 
 
 @router.post("/most_frequent_words/",
@@ -947,9 +613,229 @@ def most_frequent_words(text: Optional[str] = Form("APPL went down by 5% in the
                         lang: Optional[LangEnum] = Form(LangEnum.EN),
                         n_words: int = Form(5)):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
+    return execute(run_extractor, "most_frequent_words", lang, text, n_words=n_words)
+
+
+class CorpusFrequencyRequest(BaseModel):
+    texts: List[str]
+    lang: LangEnum = LangEnum.EN
+    n_words: int = Field(10, ge=0, le=MAX_CAPACITY)
+    sketch: bool = False
+    width: int = Field(2 ** 16, ge=1, le=MAX_WIDTH)
+    depth: int = Field(4, ge=1, le=MAX_DEPTH)
+    capacity: int = Field(1000, ge=1, le=MAX_CAPACITY)
+    chunk_size: int = Field(1000, ge=1, le=MAX_CHUNK_SIZE)
+
+
+@router.post("/corpus_frequent_words/",
+             summary="Top n words over many texts, with the filtering of /most_frequent_words/.",
+             description=
+             """
+             Texts are counted in chunks of `chunk_size` whose counts are merged. With `sketch` the
+             counts are kept in a count-min sketch of `depth` x `width` counters plus the `capacity`
+             most frequent candidates, so memory stays bounded whatever the vocabulary; the counts
+             are then upper estimates, off by at most `maxError` with high probability.
+
+             ## Examples:
+             - {"texts": ["APPL went down by 5% in the past two weeks.", "Shareholders are concerned over APPL."], "n_words": 3}
+             """)
+def corpus_frequent_words(request: CorpusFrequencyRequest):
+
+    counts = None
+    chunk_size = request.chunk_size
+    for start in range(0, len(request.texts), chunk_size):
+        chunk = execute(count_terms,
+                        request.lang,
+                        request.texts[start:start + chunk_size],
+                        request.sketch,
+                        request.width,
+                        request.depth,
+                        request.capacity)
+        counts = chunk if counts is None else counts.merge(chunk)
+    if counts is None:
+        return {"frequentWords": [], "records": 0}
+    return {"frequentWords": counts.most_common(request.n_words), **counts.stats()}
+
+
+def _count_lines(lang: LangEnum, lines: List[bytes], offset: int, sketch: bool, width: int, depth: int, capacity: int):
+    texts, invalid = [], 0
+    for i, line in enumerate(lines):
+        try:
+            texts.append(parse_record(line, offset + i)[1])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            invalid += 1
+    return count_terms(lang, texts, sketch, width, depth, capacity), invalid
+
+
+@router.post("/stream_frequent_words/",
+             summary="Top n words over a JSONL/NDJSON upload of any size.",
+             description=
+             """
+             The body is read as a stream of lines, each either a JSON object `{"id": ..., "text": ...}`
+             or a JSON string, and counted in batches of `batch_size` as it arrives, as in
+             /corpus_frequent_words/. Lines that are no valid record are skipped and counted in `invalid`.
+
+             ## Examples:
+             - {"id": 1, "text": "APPL went down by 5% in the past two weeks."}
+               {"id": 2, "text": "Shareholders are concerned over APPL."}
+             """)
+async def stream_frequent_words(request: Request,
+                                lang: LangEnum = Query(LangEnum.EN),
+                                n_words: int = Query(10, ge=0, le=MAX_CAPACITY),
+                                sketch: bool = Query(False),
+                                width: int = Query(2 ** 16, ge=1, le=MAX_WIDTH),
+                                depth: int = Query(4, ge=1, le=MAX_DEPTH),
+                                capacity: int = Query(1000, ge=1, le=MAX_CAPACITY),
+                                batch_size: int = Query(1000, ge=1, le=MAX_CHUNK_SIZE)):
+
+    counts, invalid, offset = None, 0, 0
+    try:
+        async for lines in iter_batches(iter_lines(request), batch_size):
+            chunk, chunk_invalid = await run_in_threadpool(execute, _count_lines, lang, lines, offset, sketch, width, depth, capacity)
+            counts = chunk if counts is None else counts.merge(chunk)
+            invalid += chunk_invalid
+            offset += len(lines)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if counts is None:
+        return {"frequentWords": [], "records": 0, "invalid": invalid}
+    return {"frequentWords": counts.most_common(n_words), **counts.stats(), "invalid": invalid}
+
+
+ExtractorEnum = Enum("ExtractorEnum", {name: name for name in EXTRACTORS}, type=str)
 
-    words = [token.text for token in doc if not token.is_stop and not token.is_punct]
 
-    return {"frequentWords": Counter(words).most_common(n_words)}
\ No newline at end of file
+def _check_params(names: List[str], params: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Returns the coerced params per extractor; missing, unknown or mistyped params give 422, an unknown gazetteer 404."""
+    checked = {}
+    for name in names:
+        try:
+            checked[name] = check_params(name, (params or {}).get(name))
+        except TypeError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=f"Unknown gazetteer {e.args[0]}")
+    return checked
+
+
+@router.post("/multi_extraction/",
+             summary="Runs several of the extractors above over one parse of a text.",
+             description=
+             """
+             `params` optionally holds a JSON object with the extractor specific fields per extractor,
+             e.g. `{"gazetteer": {"lookup_values": ["Max"], "your_label": "person"}}`.
+
+             ## Examples:
+             - Contact John Doe at john.doe@kern.ai or visit https://kern.ai before 05.11.2022.
+             - fr
+             - la
+             """)
+def multi_extraction(text: Optional[str] = Form("Contact John Doe at john.doe@kern.ai or visit https://kern.ai before 05.11.2022."),
+                     lang: Optional[LangEnum] = Form(LangEnum.EN),
+                     extractors: List[ExtractorEnum] = Form(["email", "url", "iban", "person", "org", "location", "date"]),
+                     params: Optional[str] = Form(None)):
+
+    try:
+        extractor_params = json.loads(params) if params else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"params is no valid JSON: {e}")
+    if extractor_params is not None and not (isinstance(extractor_params, dict)
+                                             and all(isinstance(value, dict) for value in extractor_params.values())):
+        raise HTTPException(status_code=422, detail="params must be a JSON object of objects per extractor")
+    names = [ExtractorEnum(extractor).value for extractor in extractors]
+    extractor_params = _check_params(names, extractor_params)
+    return execute(run_extractors, names, lang, text, extractor_params)
+
+
+class BatchRecord(BaseModel):
+    id: Optional[Union[int, str]] = None
+    text: str
+
+
+class BatchRequest(BaseModel):
+    extractor: ExtractorEnum
+    lang: LangEnum = LangEnum.EN
+    texts: Optional[List[str]] = None
+    records: Optional[List[BatchRecord]] = None
+    params: Dict[str, Any] = {}
+    batch_size: int = Field(64, ge=1, le=MAX_BATCH_SIZE)
+    n_process: int = 1
+
+
+@router.post("/batch_extraction/",
+             summary="Runs one of the extractors above over many texts at once.",
+             description=
+             """
+             Texts are parsed together with spaCy's `nlp.pipe`, results are returned in input order.
+             Pass either `texts` or `records` with ids; `params` holds the extractor specific fields
+             (e.g. `{"your_label": "person"}`). `n_process` is capped by the server's `SPACY_MAX_PROCESSES`.
+
+             ## Examples:
+             - {"extractor": "email", "lang": "en_core_web_sm", "texts": ["Contact johannes.hoetter@kern.ai.", "No mail here."]}
+             """)
+def batch_extraction(request: BatchRequest):
+
+    params = _check_params([request.extractor.value], {request.extractor.value: request.params})[request.extractor.value]
+    if request.records is not None:
+        ids = [record.id for record in request.records]
+        texts = [record.text for record in request.records]
+    else:
+        texts = request.texts or []
+        ids = list(range(len(texts)))
+
+    results = execute(run_batch,
+                      request.extractor.value,
+                      request.lang,
+                      texts,
+                      params=params,
+                      batch_size=request.batch_size,
+                      n_process=request.n_process)
+    return {"results": [{"id": record_id, "result": result} for record_id, result in zip(ids, results)]}
+
+
+def _extract_lines(names: List[str], lang: LangEnum, lines: List[bytes], offset: int) -> bytes:
+    records, output = [], [None] * len(lines)
+    for i, line in enumerate(lines):
+        try:
+            records.append((i, *parse_record(line, offset + i)))
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            output[i] = {"id": offset + i, "error": f"invalid record: {e}"}
+
+    results = run_extractors_batch(names, lang, [text for _, _, text in records])
+    for (i, record_id, _), result in zip(records, results):
+        output[i] = {"id": record_id, "result": result}
+    return b"".join(ndjson_line(line) for line in output)
+
+
+@router.post("/stream_extraction/",
+             summary="Runs extractors over a JSONL/NDJSON upload and streams the results back line by line.",
+             description=
+             """
+             The body is read as a stream of lines, each either a JSON object `{"id": ..., "text": ...}`
+             or a JSON string. Lines are parsed in batches of `batch_size` with `nlp.pipe` and every
+             record is answered with one line `{"id": ..., "result": {<extractor>: ...}}` as soon as its
+             batch is done, so neither the upload nor the results are held in memory as a whole.
+
+             ## Examples:
+             - {"id": 1, "text": "Contact johannes.hoetter@kern.ai"}
+               {"id": 2, "text": "Check out https://kern.ai!"}
+             """)
+async def stream_extraction(request: Request,
+                            lang: LangEnum = Query(LangEnum.EN),
+                            extractors: List[ExtractorEnum] = Query(["email", "url"]),
+                            batch_size: int = Query(64, ge=1, le=MAX_BATCH_SIZE)):
+
+    names = [ExtractorEnum(extractor).value for extractor in extractors]
+    # records carry no params, extractors that need some cannot be streamed
+    _check_params(names)
+
+    async def results():
+        offset = 0
+        try:
+            async for lines in iter_batches(iter_lines(request), batch_size):
+                yield await run_in_threadpool(execute, _extract_lines, names, lang, lines, offset)
+                offset += len(lines)
+        except ValueError as e:
+            yield ndjson_line({"id": None, "error": str(e)})
+
+    return NDJSONStreamingResponse(results())
@@ -0,0 +1,482 @@
+import inspect
+import json
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import Extra, ValidationError, confloat, create_model
+from spacy.matcher import Matcher
+
+from spacy_api.gazetteers import get_store
+from spacy_api.patterns import scan
+from spacy_api.summarization import Summarizer
+from spacy_api.windows import window_search
+from util.alignment import labeled_spans, token_spans
+from util.metrics import stage
+from util.profiling import section
+from util.utils import LangEnum, SpacySingleton
+
+# Extraction logic of the spacy routes, working on an already parsed Doc so the same
+# functions serve single records, batches and several extractors over one Doc.
+EXTRACTORS = {}
+# extractors that only map regex matches to tokens and therefore don't need the
+# tagger/parser/ner, just the tokenizer of the pipeline
+TOKENIZER_ONLY = set()
+# names of the registered patterns (see spacy_api.patterns) each regex extractor consumes
+EXTRACTOR_PATTERNS = {}
+
+COLOR_PATTERNS = ("color_hex", "color_rgb", "color_hsl", "color_hwb")
+# limit of the batch_size of the batch and stream routes, texts parsed and held together
+MAX_BATCH_SIZE = 10_000
+
+
+def extractor(name: str, tokenizer_only: bool = False, patterns: Tuple[str, ...] = ()):
+    def register(func):
+        EXTRACTORS[name] = func
+        if tokenizer_only or patterns:
+            TOKENIZER_ONLY.add(name)
+        if patterns:
+            EXTRACTOR_PATTERNS[name] = patterns
+        return func
+    return register
+
+
+def pattern_matches(doc, names: Tuple[str, ...], matches: Optional[Dict[str, List[re.Match]]] = None):
+    """Returns the matches of the given patterns, scanning the text unless they were passed in."""
+    if matches is None:
+        with section("regex_scan"):
+            matches = scan(doc.text, names)
+    return matches
+
+
+class _ParamsConfig:
+    extra = Extra.forbid
+
+
+@lru_cache(maxsize=None)
+def params_model(name: str):
+    """Pydantic model of the params clients may pass to an extractor.
+
+    Built from the parameters after the Doc, typed by their annotations; keyword-only
+    parameters (like the pre-scanned ``matches``) are internal and not part of it.
+    """
+    fields = {}
+    for parameter in list(inspect.signature(EXTRACTORS[name]).parameters.values())[1:]:
+        if parameter.kind == parameter.POSITIONAL_OR_KEYWORD:
+            annotation = Any if parameter.annotation is parameter.empty else parameter.annotation
+            fields[parameter.name] = (annotation, ... if parameter.default is parameter.empty else parameter.default)
+    return create_model(f"{name}_params", __config__=_ParamsConfig, **fields)
+
+
+def check_params(name: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Checks the params of an extractor before any text is parsed and returns them coerced to their types.
+
+    Raises TypeError for missing, unknown or mistyped params and KeyError for an unknown gazetteer.
+    """
+    try:
+        params = params_model(name).parse_obj(params or {}).dict(exclude_unset=True)
+    except ValidationError as e:
+        raise TypeError(f"{name}: " + "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()))
+    if name == "registered_gazetteer":
+        get_store().info(params["gazetteer_id"])
+    return params
+
+
+def run_extractor(name: str, lang: LangEnum, text: Optional[str], **params):
+    doc = SpacySingleton.get_doc(lang, text or "", tokenizer_only=name in TOKENIZER_ONLY)
+    with stage("extract"):
+        return EXTRACTORS[name](doc, **params)
+
+
+def run_extractors(names: List[str], lang: LangEnum, text: Optional[str], params: Optional[Dict[str, Dict[str, Any]]] = None):
+    """Runs several extractors over a single parse of the text."""
+    tokenizer_only = all(name in TOKENIZER_ONLY for name in names)
+    doc = SpacySingleton.get_doc(lang, text or "", tokenizer_only=tokenizer_only)
+    with stage("extract"):
+        return extract_all(doc, names, params)
+
+
+def run_extractors_batch(names: List[str],
+                         lang: LangEnum,
+                         texts: List[str],
+                         params: Optional[Dict[str, Dict[str, Any]]] = None,
+                         batch_size: int = 64,
+                         n_process: int = 1):
+    """Runs several extractors over many texts, parsing each text once with nlp.pipe."""
+    docs = SpacySingleton.get_docs(lang,
+                                   texts,
+                                   tokenizer_only=all(name in TOKENIZER_ONLY for name in names),
+                                   batch_size=batch_size,
+                                   n_process=n_process)
+    with stage("extract"):
+        return [extract_all(doc, names, params) for doc in docs]
+
+
+def extract_all(doc, names: List[str], params: Optional[Dict[str, Dict[str, Any]]] = None):
+    params = params or {}
+
+    # one scan over the text serves all requested regex extractors
+    pattern_names = [pattern for name in names for pattern in EXTRACTOR_PATTERNS.get(name, ())]
+    with section("regex_scan"):
+        matches = scan(doc.text, pattern_names) if pattern_names else {}
+
+    results = {}
+    for name in names:
+        if name in EXTRACTOR_PATTERNS:
+            results[name] = EXTRACTORS[name](doc, matches=matches, **params.get(name, {}))
+        else:
+            results[name] = EXTRACTORS[name](doc, **params.get(name, {}))
+    return results
+
+
+def run_batch(name: str,
+              lang: LangEnum,
+              texts: List[str],
+              params: Optional[Dict[str, Any]] = None,
+              batch_size: int = 64,
+              n_process: int = 1):
+    """Runs one extractor over many texts, parsing them with nlp.pipe. Results keep the input order."""
+    func = EXTRACTORS[name]
+    docs = SpacySingleton.get_docs(lang,
+                                   texts,
+                                   tokenizer_only=name in TOKENIZER_ONLY,
+                                   batch_size=batch_size,
+                                   n_process=n_process)
+    with stage("extract"):
+        return [func(doc, **(params or {})) for doc in docs]
+
+
+@extractor("address", patterns=("address_1", "address_2"))
+def extract_addresses(doc, *, matches=None):
+    matches = pattern_matches(doc, ("address_1", "address_2"), matches)
+
+    addresses = []
+    for span in token_spans(doc, [match.span() for match in matches["address_1"]]):
+        if span is not None:
+            addresses.append(["address", span[0], span[1], doc[span[0]:span[1]].text])
+    addresses.extend(labeled_spans(doc, "address", [match.span() for match in matches["address_2"]]))
+
+    return {"addresses": addresses}
+
+
+@extractor("color_code", patterns=COLOR_PATTERNS)
+def extract_color_codes(doc, *, matches=None):
+    matches = pattern_matches(doc, COLOR_PATTERNS, matches)
+
+    char_spans = [match.span() for name in COLOR_PATTERNS for match in matches[name]]
+    return {"extractedColorCodes": labeled_spans(doc, "color", char_spans)}
+
+
+@extractor("date", patterns=("date",))
+def extract_dates(doc, *, matches=None):
+    matches = pattern_matches(doc, ("date",), matches)
+
+    return {"dates": labeled_spans(doc, "date", [match.span() for match in matches["date"]])}
+
+
+@extractor("time", patterns=("time",))
+def extract_times(doc, *, matches=None):
+    matches = pattern_matches(doc, ("time",), matches)
+
+    return {"times": labeled_spans(doc, "time", [match.span() for match in matches["time"]])}
+
+
+@extractor("gazetteer")
+def extract_gazetteer(doc, lookup_values: List[str] = ("Max", "Leon", "Kai", "Aaron"), your_label: str = "person"):
+    """Detects full entities in a text based on some hints."""
+    matches = []
+    for chunk in doc.noun_chunks:
+        if any([chunk.text in trie or trie in chunk.text for trie in lookup_values]):
+            matches.append([your_label, chunk.start, chunk.end])
+
+    return {f"{your_label}s": matches}
+
+
+@extractor("registered_gazetteer", tokenizer_only=True)
+def extract_registered_gazetteer(doc, gazetteer_id: str, your_label: str = "person"):
+    """Finds the entries of a gazetteer registered under /gazetteers/ in linear time."""
+    char_spans = get_store().find(gazetteer_id, doc.text)
+    return {f"{your_label}s": labeled_spans(doc, your_label, char_spans)}
+
+
+@extractor("regex", tokenizer_only=True)
+def extract_regex(doc, regex: str = r"https:\/\/[a-zA-Z0-9.\/]+", your_label: str = "url"):
+    """Detects regex matches in a given text."""
+    char_spans = [match.span() for match in re.finditer(regex, doc.text)]
+    return {f"{your_label}s": labeled_spans(doc, your_label, char_spans)}
+
+
+@extractor("window_search")
+def extract_window_search(doc,
+                          lookup_values: List[str] = ("join", "works at", "is employed by"),
+                          window_size: int = 6,
+                          your_label: str = "person"):
+    matches = [
+        [your_label, window.chunk.start, window.chunk.end]
+        for window in window_search(doc, tuple(lookup_values), window_size)
+    ]
+    return {f"{your_label}s": matches}
+
+
+@extractor("work_of_art")
+def extract_works_of_art(doc):
+    found = []
+    for entity in doc.ents:
+        if entity.label_ == "WORK_OF_ART":
+            found.append(["work of art", entity.start, entity.end])
+
+    return {"works of art": found}
+
+
+@extractor("bic", patterns=("bic",))
+def extract_bic(doc, *, matches=None):
+    matches = pattern_matches(doc, ("bic",), matches)
+
+    return {"bic": labeled_spans(doc, "BIC", [match.span() for match in matches["bic"]])}
+
+
+@extractor("credit_card", patterns=("credit_card",))
+def extract_credit_cards(doc, *, matches=None):
+    matches = pattern_matches(doc, ("credit_card",), matches)
+
+    credit = []
+    for span in token_spans(doc, [match.span() for match in matches["credit_card"]]):
+        if span is not None:
+            credit.append([span[0], span[1], doc[span[0]:span[1]].text])
+
+    return {"creditCard": credit}
+
+
+@extractor("digit", tokenizer_only=True)
+def extract_digits(doc, digit_length: int = 4):
+    num_string = "{"+f"{digit_length}"+"}"
+    regex = re.compile(rf"(?<![0-9])[0-9]{num_string}(?![0-9])")
+
+    for span in token_spans(doc, [match.span() for match in regex.finditer(doc.text)]):
+        if span is not None:
+            return {"Number": [span[0], span[1]]}
+    return {"Number": []}
+
+
+@extractor("iban", patterns=("iban",))
+def extract_iban(doc, *, matches=None):
+    """Extracts IBAN from text"""
+    matches = pattern_matches(doc, ("iban",), matches)
+
+    return {"iban": labeled_spans(doc, "IBAN", [match.span() for match in matches["iban"]])}
+
+
+@extractor("ip", patterns=("ip",))
+def extract_ip_addresses(doc, *, matches=None):
+    matches = pattern_matches(doc, ("ip",), matches)
+
+    return {"ip_addresses": labeled_spans(doc, "ip_address", [match.span() for match in matches["ip"]])}
+
+
+@extractor("percentage", patterns=("percentage",))
+def extract_percentages(doc, *, matches=None):
+    matches = pattern_matches(doc, ("percentage",), matches)
+
+    return {"percentages": labeled_spans(doc, "percentage", [match.span() for match in matches["percentage"]])}
+
+
+@extractor("phone_number", patterns=("phone_number",))
+def extract_phone_numbers(doc, *, matches=None):
+    import phonenumbers
+
+    matches = pattern_matches(doc, ("phone_number",), matches)
+
+    valid_numbers = []
+    with section("phonenumbers"):
+        for match in matches["phone_number"]:
+            try:
+                parsed_num = phonenumbers.parse(match.group(0), None)
+                if phonenumbers.is_valid_number(parsed_num):
+                    valid_numbers.append(match.span())
+            except phonenumbers.phonenumberutil.NumberParseException:
+                pass
+
+    return {"phoneNumbers": labeled_spans(doc, "phoneNumber", valid_numbers)}
+
+
+@extractor("price")
+def extract_prices(doc):
+    prices = []
+    for entity in doc.ents:
+        if entity.label_ == "MONEY":
+            prices.append(["price", entity.start, entity.end])
+
+    return {"prices": prices}
+
+
+@extractor("filepath", tokenizer_only=True)
+def extract_filepaths(doc, separator: str = "/", your_label: str = "path"):
+    text = doc.text
+    # Extracts the paths from the texts
+    paths = [x for x in text.split() if len(x.split(separator)) > 1]
+
+    # We need to add an \ before separators to use them in regex
+    regex_paths = [i.replace(separator, "\\"+separator) for i in paths]
+
+    char_spans = []
+    for path in regex_paths:
+        pattern = rf"({path})"
+        match = re.search(pattern, text)
+        char_spans.append(match.span())
+
+    return {f"{your_label}s": labeled_spans(doc, your_label, char_spans)}
+
+
+@extractor("url", patterns=("url",))
+def extract_urls(doc, *, matches=None):
+    matches = pattern_matches(doc, ("url",), matches)
+
+    return {"urls": labeled_spans(doc, "url", [match.span() for match in matches["url"]])}
+
+
+@extractor("email", patterns=("email",))
+def extract_emails(doc, *, matches=None):
+    matches = pattern_matches(doc, ("email",), matches)
+
+    return {"emails": labeled_spans(doc, "email", [match.span() for match in matches["email"]])}
+
+
+@extractor("location")
+def extract_locations(doc):
+    names = []
+    for ent in doc.ents:
+        if ent.label_ == "GPE" or ent.label_ == "LOC":
+            names.append(["location", ent.start, ent.end])
+    return {"locations": names}
+
+
+@extractor("person")
+def extract_persons(doc):
+    names = []
+    for entity in doc.ents:
+        if entity.label_ == "PERSON":
+            names.append(["person", entity.start, entity.end])
+    # "name" will contain all the occurrences of a particular name.
+    # This is because spacy treats each word in a text as a unique vector.
+    # So, two occurrences of "Div" does not mean "Div" == "Div"!
+    return {"names": names}
+
+
+@lru_cache(maxsize=1)
+def zip_code_patterns() -> Dict[str, str]:
+    """Zip code regex per country, loaded on the first zipcode extraction."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "zip_codes.json")) as f:
+        return json.load(f)
+
+
+@extractor("zipcode", tokenizer_only=True)
+def extract_zipcode(doc, country_id: str = "GB"):
+    match = re.search(zip_code_patterns()[country_id], doc.text)
+
+    spans = labeled_spans(doc, "zipcode", [match.span()] if match else [])
+    if not spans:
+        return "No zipcodes found"
+
+    return {country_id: spans[0]}
+
+
+@extractor("hashtag", patterns=("hashtag",))
+def extract_hashtags(doc, *, matches=None):
+    matches = pattern_matches(doc, ("hashtag",), matches)
+
+    return {"hashtags": labeled_spans(doc, "hashtag", [match.span() for match in matches["hashtag"]])}
+
+
+@extractor("noun_match")
+def extract_noun_matches(doc):
+    """Extracts all similar noun chunks from a text"""
+    # the first word of every noun chunk with more than one word is a target word
+    target_words = {chunk[0].lower_ for chunk in doc.noun_chunks if sum(not token.is_space for token in chunk) >= 2}
+    if not target_words:
+        return {"quote": []}
+
+    # a target word (in any casing), optional punctuation and the word following it, all
+    # target words in one matcher and one pass over the Doc
+    matcher = Matcher(doc.vocab)
+    matcher.add("noun_match", [[
+        {"LOWER": {"IN": sorted(target_words)}},
+        {"IS_PUNCT": True, "OP": "*"},
+        {"IS_PUNCT": False, "IS_SPACE": False},
+    ]])
+    matches = [["match", start, end] for _, start, end in matcher(doc)]
+    return {"quote": matches}
+
+
+@extractor("org")
+def extract_orgs(doc):
+    organisations = []
+    for entity in doc.ents:
+        if entity.label_ == "ORG":
+            organisations.append(["org", entity.start, entity.end])
+
+    return {"organisations": organisations}
+
+
+@extractor("part_of_speech")
+def extract_part_of_speech(doc):
+    pos_tags = []
+    for token in doc:
+        pos_tags.append([token.pos_, token.i, token.i + 1])
+
+    return {"POS tags": pos_tags}
+
+
+@extractor("quote", patterns=("quote",))
+def extract_quotes(doc, *, matches=None):
+    matches = pattern_matches(doc, ("quote",), matches)
+
+    return {"quote": labeled_spans(doc, "quote", [match.span() for match in matches["quote"]])}
+
+
+@extractor("substring", tokenizer_only=True)
+def extract_substring(doc, substring: str = "This is a duplicate."):
+    start_index = doc.text.find(substring)
+    end_index = start_index + len(substring)
+
+    if start_index != -1:
+        span = token_spans(doc, [(start_index, end_index)])[0]
+        if span is not None:
+            return {"Substring": [span[0], span[1]]}
+    return "No substring found!"
+
+
+@extractor("lemmatizer")
+def lemmatize(doc):
+    final_text = ""
+    for i, token in enumerate(doc):
+        if i > 0:
+            diff = token.idx - (doc[i - 1].idx + len(doc[i - 1]))
+            if diff > 0:
+                final_text += " " * diff
+        final_text += token.lemma_
+    return {"lemmatized_text": final_text}
+
+
+@extractor("noun_splitter")
+def split_nouns(doc):
+    nouns_sents = set()
+    for sent in doc.sents:
+        for token in sent:
+            if token.pos_ == "NOUN" and len(token.text) > 1:
+                nouns_sents.add(token.text)
+
+    return {"nouns": list(nouns_sents)}
+
+
+@extractor("text_summarization")
+def summarize(doc, length: confloat(ge=0, le=1) = 0.5):
+    return {"summary": Summarizer(doc.lang_).add(doc).summary(length)}
+
+
+@extractor("most_frequent_words", tokenizer_only=True)
+def most_frequent_words(doc, n_words: int = 5):
+    words = [token.text for token in doc if not token.is_stop and not token.is_punct]
+
+    return {"frequentWords": Counter(words).most_common(n_words)}
@@ -0,0 +1,146 @@
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from spacy.attrs import IS_PUNCT, IS_STOP, ORTH
+
+from util.utils import LangEnum, SpacySingleton
+
+# odd multipliers and offsets of the sketch rows' hash functions; fixed, so sketches built by
+# different processes can be merged
+SKETCH_SEED = 20231017
+# limits of the request parameters; a sketch takes 8 * width * depth bytes per chunk
+MAX_WIDTH = 2 ** 20
+MAX_DEPTH = 8
+MAX_CAPACITY = 100_000
+MAX_CHUNK_SIZE = 10_000
+
+
+def counted_terms(doc) -> Tuple[np.ndarray, np.ndarray]:
+    """Orth ids and counts of the tokens of a Doc that are neither stop words nor punctuation.
+
+    Both flags are lexical, so a tokenizer-only Doc gives the same counts as a parsed one.
+    """
+    attrs = doc.to_array([ORTH, IS_STOP, IS_PUNCT]).reshape(-1, 3)
+    keys = attrs[(attrs[:, 1] == 0) & (attrs[:, 2] == 0), 0]
+    return np.unique(keys, return_counts=True)
+
+
+class TermCounts:
+    """Exact term frequencies of any number of Docs; counts of different chunks merge by addition."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.records = 0
+
+    def add(self, doc) -> "TermCounts":
+        keys, counts = counted_terms(doc)
+        self.counts.update({doc.vocab.strings[key]: count for key, count in zip(keys.tolist(), counts.tolist())})
+        self.records += 1
+        return self
+
+    def merge(self, other: "TermCounts") -> "TermCounts":
+        self.counts.update(other.counts)
+        self.records += other.records
+        return self
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        return self.counts.most_common(n)
+
+    def stats(self) -> dict:
+        return {"mode": "exact", "records": self.records, "total": sum(self.counts.values()), "terms": len(self.counts)}
+
+
+class SketchCounts:
+    """Approximate term frequencies in bounded memory: a count-min sketch plus heavy hitter candidates.
+
+    Every term is counted in ``depth`` rows of ``width`` counters, its estimate is the smallest
+    of its counters, which overcounts by at most ``e / width`` of all counted tokens with
+    probability ``1 - exp(-depth)``. Besides the sketch only the ``capacity`` terms with the
+    highest estimates are kept (pruned from twice as many), so memory doesn't grow with the
+    vocabulary. Terms are hashed by their spaCy orth id, which is the same in every process.
+    """
+
+    def __init__(self, width: int = 2 ** 16, depth: int = 4, capacity: int = 1000):
+        if width < 1 or depth < 1 or capacity < 1:
+            raise ValueError("width, depth and capacity of a sketch must be positive")
+        random = np.random.default_rng(SKETCH_SEED)
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.multipliers = random.integers(1, 2 ** 63, size=(depth, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.offsets = random.integers(0, 2 ** 63, size=(depth, 1), dtype=np.uint64)
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.candidates = {}
+        self.records = 0
+        self.total = 0
+
+    def _columns(self, keys: np.ndarray) -> np.ndarray:
+        # multiply-shift hashing, wrapping around 2**64
+        with np.errstate(over="ignore"):
+            hashes = keys.astype(np.uint64)[None, :] * self.multipliers + self.offsets
+        return ((hashes >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        columns = self._columns(keys)
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+    def _prune(self):
+        if len(self.candidates) <= 2 * self.capacity:
+            return
+        keys = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        keep = keys[np.argsort(-self.estimate(keys), kind="stable")[:self.capacity]]
+        self.candidates = {key: self.candidates[key] for key in keep.tolist()}
+
+    def add(self, doc) -> "SketchCounts":
+        keys, counts = counted_terms(doc)
+        columns = self._columns(keys)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+        for key in keys.tolist():
+            if key not in self.candidates:
+                self.candidates[key] = doc.vocab.strings[key]
+        self.records += 1
+        self.total += int(counts.sum())
+        self._prune()
+        return self
+
+    def merge(self, other: "SketchCounts") -> "SketchCounts":
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("only sketches of the same width and depth can be merged")
+        self.table += other.table
+        for key, term in other.candidates.items():
+            self.candidates.setdefault(key, term)
+        self.records += other.records
+        self.total += other.total
+        self._prune()
+        return self
+
+    def most_common(self, n: int) -> List[Tuple[str, int]]:
+        keys = np.fromiter(self.candidates, dtype=np.uint64, count=len(self.candidates))
+        estimates = self.estimate(keys)
+        order = np.argsort(-estimates, kind="stable")[:n]
+        return [(self.candidates[int(keys[i])], int(estimates[i])) for i in order]
+
+    def stats(self) -> dict:
+        return {
+            "mode": "sketch",
+            "records": self.records,
+            "total": self.total,
+            "maxError": int(np.ceil(np.e / self.width * self.total)),
+        }
+
+
+def count_terms(lang: LangEnum,
+                texts: Iterable[str],
+                sketch: bool = False,
+                width: int = 2 ** 16,
+                depth: int = 4,
+                capacity: int = 1000,
+                batch_size: int = 256):
+    """Counts the terms of a chunk of texts with the tokenizer only; the Docs are not cached."""
+    counts = SketchCounts(width, depth, capacity) if sketch else TermCounts()
+    nlp = SpacySingleton.get_nlp(lang)
+    for doc in nlp.tokenizer.pipe(texts, batch_size=batch_size):
+        counts.add(doc)
+    return counts
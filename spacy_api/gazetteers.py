@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+
+from util.utils import data_dir
+
+# flashtext only treats ASCII letters, digits and "_" as part of a word; accented letters of
+# French and Latin text must not end a keyword either
+WORD_CHARACTERS = {chr(code) for code in range(0xC0, 0x250) if chr(code).isalpha()}
+
+
+class GazetteerStore:
+    """Registered gazetteers, compiled into flashtext automatons and persisted by id.
+
+    Every gazetteer is stored as ``<id>.txt`` (one entry per line), ``<id>.json`` (metadata)
+    and ``<id>.pickle`` (the compiled KeywordProcessor, rebuilt from the entries if missing).
+    The id is derived from the entries and options, so registering the same list twice
+    returns the same id. Matching a text is linear in its length, whatever the number of entries.
+    Compiled automatons are cached per process, keyed by the mtime of the metadata file.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.processors = {}
+        self._lock = threading.Lock()
+
+    def _path(self, gazetteer_id: str, suffix: str) -> str:
+        if not gazetteer_id.isalnum():
+            raise KeyError(gazetteer_id)
+        return os.path.join(self.directory, f"{gazetteer_id}.{suffix}")
+
+    @staticmethod
+    def _compile(entries: Iterable[str], case_sensitive: bool):
+        from flashtext import KeywordProcessor
+
+        processor = KeywordProcessor(case_sensitive=case_sensitive)
+        processor.non_word_boundaries |= WORD_CHARACTERS
+        for entry in entries:
+            if entry:
+                processor.add_keyword(entry)
+        return processor
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def register(self, entries: Iterable[str], case_sensitive: bool = False) -> dict:
+        entries = list(dict.fromkeys(entry.strip() for entry in entries if entry and entry.strip()))
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(b"1" if case_sensitive else b"0")
+        for entry in entries:
+            digest.update(entry.encode("utf-8") + b"\n")
+        gazetteer_id = digest.hexdigest()
+
+        if os.path.exists(self._path(gazetteer_id, "json")):
+            return self.info(gazetteer_id)
+
+        info = {"id": gazetteer_id, "entries": len(entries), "caseSensitive": case_sensitive, "createdAt": time.time()}
+        processor = self._compile(entries, case_sensitive)
+        self._write(self._path(gazetteer_id, "txt"), "\n".join(entries).encode("utf-8"))
+        self._write(self._path(gazetteer_id, "pickle"), pickle.dumps(processor, protocol=pickle.HIGHEST_PROTOCOL))
+        # written last, marks a complete gazetteer
+        self._write(self._path(gazetteer_id, "json"), json.dumps(info).encode("utf-8"))
+        with self._lock:
+            self.processors[gazetteer_id] = (self._modified(gazetteer_id), processor)
+        return info
+
+    def info(self, gazetteer_id: str) -> dict:
+        try:
+            with open(self._path(gazetteer_id, "json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(gazetteer_id)
+
+    def _modified(self, gazetteer_id: str) -> float:
+        try:
+            return os.stat(self._path(gazetteer_id, "json")).st_mtime
+        except FileNotFoundError:
+            raise KeyError(gazetteer_id)
+
+    def get(self, gazetteer_id: str):
+        # the metadata file is checked on every call, so a gazetteer deleted (or registered
+        # again) by another worker is not served from this worker's cache
+        try:
+            modified = self._modified(gazetteer_id)
+        except KeyError:
+            with self._lock:
+                self.processors.pop(gazetteer_id, None)
+            raise
+        with self._lock:
+            cached = self.processors.get(gazetteer_id)
+        if cached is not None and cached[0] == modified:
+            return cached[1]
+
+        info = self.info(gazetteer_id)
+        try:
+            with open(self._path(gazetteer_id, "pickle"), "rb") as f:
+                processor = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with open(self._path(gazetteer_id, "txt"), encoding="utf-8") as f:
+                processor = self._compile(f.read().split("\n"), info["caseSensitive"])
+        with self._lock:
+            self.processors[gazetteer_id] = (modified, processor)
+        return processor
+
+    def delete(self, gazetteer_id: str):
+        info = self.info(gazetteer_id)
+        with self._lock:
+            self.processors.pop(gazetteer_id, None)
+        for suffix in ("json", "pickle", "txt"):
+            try:
+                os.remove(self._path(gazetteer_id, suffix))
+            except FileNotFoundError:
+                pass
+        return info
+
+    def find(self, gazetteer_id: str, text: str) -> List[Tuple[int, int]]:
+        """Character spans of the longest entries found in ``text``, left to right."""
+        processor = self.get(gazetteer_id)
+        if processor.case_sensitive or len(text.lower()) == len(text):
+            return [(start, end) for _, start, end in processor.extract_keywords(text, span_info=True)]
+
+        # flashtext matches the lowercased text, in which some characters (e.g. "İ") are longer;
+        # its offsets are mapped back to the characters they were lowercased from
+        lowered = [char.lower() for char in text]
+        origins = [i for i, char in enumerate(lowered) for _ in char]
+        return [(origins[start], origins[end - 1] + 1)
+                for _, start, end in processor.extract_keywords("".join(lowered), span_info=True)]
+
+
+@lru_cache(maxsize=1)
+def get_store() -> GazetteerStore:
+    return GazetteerStore(data_dir("gazetteers"))
@@ -0,0 +1,73 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# Precompiled patterns of the regex based extractors. Several extractors can be served by
+# one Scanner, which finds the candidate positions of all its patterns in one pass.
+PATTERNS = {
+    "address_1": re.compile(
+        r"(?:\d{1,5}(?:[A-Z ]+[ ]?)+(?:[A-Za-z-]+[ ]?)+(?:Avenue|Lane|Road|Boulevard|Drive|Street|Ave|Dr(?:\.)?|Rd(?:\.)?|Blvd(?:\.)?|Ln(?:\.)?|St(?:\.)?|Strasse|Hill|Alley|Alle|City)[,](?:[ A-Za-z0-9,]+[ ]?)?)"
+    ),
+    "address_2": re.compile(
+        r"(?:(?:[A-Za-z-]?)+[ ](?:Avenue|Lane|Road|Boulevard|Drive|Street|Ave|Dr(?:\.)?|Rd(?:\.)?|Blvd(?:\.)?|Ln(?:\.)?|St(?:\.)?|Strasse|Str(?:\.)?|Hill|Alley|Alle|City)[ ]+\d{1,5},(?:[ A-Za-z0-9,]+[ ]?)?)"
+    ),
+    # https://developer.mozilla.org/en-US/docs/Web/CSS/color_value
+    "color_hex": re.compile(r"#([0-9a-fA-F]{8}|[0-9a-fA-F]{6}|[0-9a-fA-F]{4}|[0-9a-fA-F]{3})(?![0-9a-fA-F])"),
+    "color_rgb": re.compile(r"(rgba|rgb)\([^\)]*\)"),
+    "color_hsl": re.compile(r"(hsla|hsl)\([^\)]*\)"),
+    "color_hwb": re.compile(r"hwb\([^\)]*\)"),
+    "date": re.compile(
+        r"(?:[0-9]{1,2}|[0-9]{4}|Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)[\/\. -]{1}(?:[0-9]{1,2}|Jan(?:uary)?|Feb(?:ruary)?|Mar(?:ch)?|Apr(?:il)?|May|Jun(?:e)?|Jul(?:y)?|Aug(?:ust)?|Sep(?:tember)?|Oct(?:ober)?|Nov(?:ember)?|Dec(?:ember)?)[,\/\. -]{1}(?:[0-9]{2,4})"
+    ),
+    "time": re.compile(
+        r"\b(1[0-2]|[1-9])\s*[apAP][. ]*[mM]\.?|(?:(?:[01]?[0-9]|2[0-3]):[0-5][0-9](?::[0-5][0-9])?(?:(?:\s?[ap](?:\.m\.)?)|(?:\s?[AP](?:\.M\.)?)))|(?:[01]?[0-9]|2[0-3]):[0-5][0-9](?::[0-5][0-9])?"
+    ),
+    "bic": re.compile(r'\b[A-Z0-9]{4,4}[A-Z]{2,2}[A-Z2-9][A-NP-Z0-9]([X]{3,3}|[A-WY-Z0-9]{1,1}[A-Z0-9]{2,2}|\s|\W|$)'),
+    "credit_card": re.compile(r"(\d{4}[-\s]?){3}\d{3,4}"),
+    "iban": re.compile(r"[A-Z]{2}\d{2} ?\d{4} ?\d{4} ?\d{4} ?\d{4} ?[\d]{0,2}"),
+    "ip": re.compile(r"\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b"),
+    "percentage": re.compile(r"(-?\d+(?:[.,]\d*)?|-?[.,]\d+)\s*%"),
+    "phone_number": re.compile(r"[\+]?[(]?[0-9]{3}[)]?[-\s\.]?[0-9]{3}[-\s\.]?[0-9]{4,6}"),
+    "url": re.compile(r"(?:(?:(?:https?|ftp):\/\/){1})?[\w\-\/?=%.]{3,}\.[\/\w\-&?=%.]{2,}"),
+    "email": re.compile(r"([a-zA-Z0-9._-]+@[a-zA-Z0-9._-]+\.[a-zA-Z0-9_-]+)"),
+    "hashtag": re.compile(r"#(\w*)"),
+    "quote": re.compile(r'\"(.+?)"|\'(.*?)\''),
+}
+
+
+class Scanner:
+    """Scans a text for several registered patterns at once.
+
+    All patterns are merged into a single zero-width lookahead alternation, so one pass of
+    the regex engine yields every position at which any of them matches. Only at those
+    positions the individual patterns are matched, which gives exactly the matches
+    ``pattern.finditer`` would return for each of them, overlaps between patterns included.
+    """
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = names
+        self.patterns = [PATTERNS[name] for name in names]
+        self.combined = re.compile("(?=" + "|".join(f"(?:{pattern.pattern})" for pattern in self.patterns) + ")")
+
+    def scan(self, text: str) -> Dict[str, List[re.Match]]:
+        matches = {name: [] for name in self.names}
+        next_start = dict.fromkeys(self.names, 0)
+        for candidate in self.combined.finditer(text):
+            position = candidate.start()
+            for name, pattern in zip(self.names, self.patterns):
+                if position < next_start[name]:
+                    continue
+                match = pattern.match(text, position)
+                if match:
+                    matches[name].append(match)
+                    next_start[name] = max(match.end(), position + 1)
+        return matches
+
+
+@lru_cache(maxsize=256)
+def get_scanner(names: Tuple[str, ...]) -> Scanner:
+    return Scanner(names)
+
+
+def scan(text: str, names: Iterable[str]) -> Dict[str, List[re.Match]]:
+    return get_scanner(tuple(dict.fromkeys(names))).scan(text)
@@ -0,0 +1,120 @@
+import string
+from functools import lru_cache
+from itertools import islice
+from typing import Iterable, List, Union
+
+import numpy as np
+from spacy.attrs import LOWER
+from spacy.util import get_lang_class
+
+from util.metrics import stage
+from util.utils import LangEnum, SpacySingleton
+
+PUNCTUATION = frozenset(string.punctuation)
+
+
+@lru_cache(maxsize=None)
+def stop_words(lang: str) -> frozenset:
+    """Lowercased stop words of a spaCy language code, English ones if spaCy has no such language."""
+    try:
+        words = get_lang_class(lang).Defaults.stop_words
+    except ImportError:
+        words = get_lang_class("en").Defaults.stop_words
+    return frozenset(word.lower() for word in words)
+
+
+class Summarizer:
+    """Frequency based extractive summary, fed one Doc (or sentence-aligned chunk of a text) at a time.
+
+    Per chunk only the lowercase ids of the scored tokens and the number of them in each sentence
+    are kept, as NumPy arrays. A term's weight is its frequency over all chunks, so sentences
+    are scored once at the end: the counts of all scored tokens are looked up with one
+    ``np.unique`` and summed per sentence over a cumulative sum. Normalizing by the highest
+    count doesn't change the ranking and is left out.
+    """
+
+    def __init__(self, lang: str):
+        self.stop_words = stop_words(lang)
+        self.scored = {}
+        self.keys = []
+        self.lengths = []
+        self.sentences = []
+
+    def _is_scored(self, vocab, key: int) -> bool:
+        scored = self.scored.get(key)
+        if scored is None:
+            text = vocab.strings[key]
+            scored = bool(text.strip()) \
+                and text not in self.stop_words \
+                and not vocab[text].is_punct \
+                and not set(text) <= PUNCTUATION
+            self.scored[key] = scored
+        return scored
+
+    def add(self, doc) -> "Summarizer":
+        if not len(doc):
+            return self
+        keys = doc.to_array(LOWER)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        scored = np.fromiter((self._is_scored(doc.vocab, key) for key in unique.tolist()), dtype=bool, count=len(unique))
+        mask = scored[inverse.reshape(-1)]
+
+        sentences = list(doc.sents)
+        bounds = np.array([sent.start for sent in sentences] + [len(doc)])
+        scored_before = np.concatenate(([0], np.cumsum(mask)))
+        self.lengths.append(np.diff(scored_before[bounds]))
+        self.keys.append(keys[mask])
+        self.sentences.extend(sent.text for sent in sentences)
+        return self
+
+    def summary(self, length: float = 0.5) -> str:
+        """The top ``length`` share of the sentences, highest scored first, sentences without scored words left out."""
+        if not self.sentences:
+            return ""
+        keys = np.concatenate(self.keys)
+        lengths = np.concatenate(self.lengths)
+        _, terms, counts = np.unique(keys, return_inverse=True, return_counts=True)
+
+        totals = np.concatenate(([0], np.cumsum(counts[terms.reshape(-1)])))
+        ends = np.cumsum(lengths)
+        scores = totals[ends] - totals[ends - lengths]
+
+        size = max(0, int(len(self.sentences) * length))
+        order = np.argsort(-scores, kind="stable")[:size]
+        return " ".join(self.sentences[i] for i in order if scores[i] > 0)
+
+
+def summarize_chunks(lang: LangEnum, chunks: Iterable[str], length: float = 0.5, batch_size: int = 64) -> dict:
+    """Summarizes a text given as consecutive chunks (e.g. chapters), holding ``batch_size`` parsed chunks at a time.
+
+    The chunks should end at sentence boundaries; they are parsed through ``SpacySingleton.get_docs``,
+    so chunks longer than the pipeline's ``max_length`` are split further and Docs are cached.
+    """
+    summarizer = Summarizer(SpacySingleton.get_nlp(lang).lang)
+    chunks = iter(chunks)
+    while True:
+        batch = list(islice(chunks, batch_size))
+        if not batch:
+            break
+        for doc in SpacySingleton.get_docs(lang, batch, batch_size=batch_size):
+            summarizer.add(doc)
+    with stage("extract"):
+        return {"summary": summarizer.summary(length)}
+
+
+def summarize_batch(lang: LangEnum,
+                    documents: List[Union[str, List[str]]],
+                    length: float = 0.5,
+                    batch_size: int = 64) -> List[dict]:
+    """Summarizes many documents, each a text or a list of its chunks. Results keep the input order."""
+    texts = [i for i, document in enumerate(documents) if isinstance(document, str)]
+    docs = SpacySingleton.get_docs(lang, [documents[i] for i in texts], batch_size=batch_size)
+
+    results = [None] * len(documents)
+    with stage("extract"):
+        for i, doc in zip(texts, docs):
+            results[i] = {"summary": Summarizer(doc.lang_).add(doc).summary(length)}
+    for i, document in enumerate(documents):
+        if results[i] is None:
+            results[i] = summarize_chunks(lang, document, length, batch_size)
+    return results
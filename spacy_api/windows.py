@@ -0,0 +1,80 @@
+import bisect
+import re
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+
+class Window(NamedTuple):
+    """Token window around a noun chunk, cut at the chunk's sentence, and its character range."""
+    chunk: object
+    start: int
+    end: int
+    char_start: int
+    char_end: int
+
+
+def chunk_windows(doc, window_size: int) -> List[Window]:
+    """Windows of ``window_size // 2 - 1`` tokens left and ``window_size // 2 + 1`` right of each noun chunk.
+
+    Sentence bounds and token offsets are read once per Doc, so this is O(tokens + chunks)
+    instead of looking up ``chunk.sent`` for every chunk.
+    """
+    sentences = [(sent.start, sent.end) for sent in doc.sents]
+    sentence_starts = [start for start, _ in sentences]
+    token_starts = [token.idx for token in doc]
+    token_ends = [token.idx + len(token) for token in doc]
+
+    windows = []
+    for chunk in doc.noun_chunks:
+        sent_start, sent_end = sentences[bisect.bisect_right(sentence_starts, chunk.start) - 1]
+        start = min(max(sent_start, chunk.start - (window_size // 2) + 1), len(doc))
+        end = max(start, min(sent_end, chunk.end + (window_size // 2) + 1))
+        if start < end:
+            windows.append(Window(chunk, start, end, token_starts[start], token_ends[end - 1]))
+        else:
+            # window sizes below 2 can leave nothing of the window, like an empty doc[start:end]
+            position = token_starts[start] if start < len(doc) else len(doc.text)
+            windows.append(Window(chunk, start, start, position, position))
+    return windows
+
+
+class TermHits:
+    """Occurrences of lookup terms in a text, queried by character range.
+
+    One zero-width lookahead alternation (shortest term first) visits every position of the
+    text once and yields the shortest term starting there; overlapping occurrences included.
+    ``min_end[i]`` is the smallest end of the hits from the i-th on, so whether a range holds a
+    complete occurrence of any term is one binary search.
+    """
+
+    def __init__(self, matcher, text: str):
+        self.starts = []
+        ends = []
+        if matcher is not None:
+            for match in matcher.finditer(text):
+                self.starts.append(match.start())
+                ends.append(match.start() + len(match.group(1)))
+        self.min_end = ends
+        for i in range(len(ends) - 2, -1, -1):
+            self.min_end[i] = min(ends[i], self.min_end[i + 1])
+
+    def contains(self, char_start: int, char_end: int) -> bool:
+        i = bisect.bisect_left(self.starts, char_start)
+        return i < len(self.starts) and self.min_end[i] <= char_end
+
+
+@lru_cache(maxsize=256)
+def term_matcher(terms: Tuple[str, ...]):
+    terms = sorted(set(terms), key=len)
+    if not terms:
+        return None
+    return re.compile("(?=(" + "|".join(re.escape(term) for term in terms) + "))")
+
+
+def window_search(doc, terms: Tuple[str, ...], window_size: int) -> List[Window]:
+    """Windows of the noun chunks whose window text contains any of the terms."""
+    windows = chunk_windows(doc, window_size)
+    if "" in terms:
+        return windows
+    hits = TermHits(term_matcher(terms), doc.text)
+    return [window for window in windows if hits.contains(window.char_start, window.char_end)]
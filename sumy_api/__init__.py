@@ -1,13 +1,10 @@
 from typing import Optional
 from fastapi import APIRouter
 from fastapi import Form
-from sumy.parsers.html import HtmlParser
-from sumy.nlp.tokenizers import Tokenizer
-from sumy.summarizers.lsa import LsaSummarizer as Summarizer
-from sumy.nlp.stemmers import Stemmer
-from sumy.utils import get_stop_words
 
-router = APIRouter()
+from util.profiling import ProfilingRoute
+
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/sumy_website_summarizer/",
              summary="Summarize a website using sumy.",
@@ -25,6 +22,12 @@ def sumy_website_summarizer(url: Optional[str] = Form('https://en.wikipedia.org/
                             language: str = Form('english'),
                             sentence_count: int = Form(5)):
 
+    from sumy.nlp.stemmers import Stemmer
+    from sumy.nlp.tokenizers import Tokenizer
+    from sumy.parsers.html import HtmlParser
+    from sumy.summarizers.lsa import LsaSummarizer as Summarizer
+    from sumy.utils import get_stop_words
+
     parser = HtmlParser.from_url(url, Tokenizer(language))
     stemmer = Stemmer(language)
     summarizer = Summarizer(stemmer)
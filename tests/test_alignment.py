@@ -0,0 +1,74 @@
+import gc
+import random
+import weakref
+
+import pytest
+import spacy
+
+from util.alignment import TokenAlignment, get_alignment, labeled_spans, token_spans
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    return spacy.blank("en")
+
+
+def expected_span(doc, start, end):
+    if not 0 <= start < end <= len(doc.text):
+        return None
+    span = doc.char_span(start, end, alignment_mode="expand")
+    return (span.start, span.end) if span is not None and len(span) else None
+
+
+def test_whitespace_ranges(nlp):
+    doc = nlp("Hello world")
+    assert token_spans(doc, [(5, 11), (5, 6), (4, 6), (0, 6)]) == [(1, 2), None, (0, 1), (0, 1)]
+    assert labeled_spans(doc, "word", [(5, 11)]) == [["word", 1, 2]]
+
+
+@pytest.mark.parametrize("text", [
+    "Contact johannes.hoetter@kern.ai, or visit  https://kern.ai!",
+    "  leading and trailing whitespace  ",
+    "one",
+])
+def test_token_spans_match_expanded_char_spans(nlp, text):
+    doc = nlp(text)
+    char_spans = [(start, end) for start in range(len(text) + 1) for end in range(start, len(text) + 1)]
+    assert token_spans(doc, char_spans) == [expected_span(doc, start, end) for start, end in char_spans]
+
+
+def test_random_ranges(nlp):
+    rng = random.Random(0)
+    words = ["a", "bb", "ccc", ",", ".", "  ", "\n", "kern.ai", "@"]
+    for _ in range(100):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 15)))
+        doc = nlp(text)
+        char_spans = [tuple(sorted((rng.randint(0, len(text)), rng.randint(0, len(text))))) for _ in range(20)]
+        assert token_spans(doc, char_spans) == [expected_span(doc, start, end) for start, end in char_spans]
+
+
+def test_invalid_ranges(nlp):
+    doc = nlp("Hello world")
+    assert token_spans(doc, [(5, 3), (-1, 2), (0, 100)]) == [None, None, None]
+    assert token_spans(doc, []) == []
+    assert labeled_spans(doc, "word", [(0, 5), (4, 4), (6, 11)]) == [["word", 0, 1], ["word", 1, 2]]
+
+
+def test_empty_doc(nlp):
+    starts, ends, valid = TokenAlignment(nlp("")).align([0], [1])
+    assert not valid.any()
+
+
+def test_alignment_is_reused_per_doc(nlp):
+    doc = nlp("Hello world")
+    assert get_alignment(doc) is get_alignment(doc)
+    assert get_alignment(nlp("Hello world")) is not get_alignment(doc)
+
+
+def test_alignment_is_released_with_its_doc(nlp):
+    doc = nlp("Hello world")
+    get_alignment(doc)
+    reference = weakref.ref(doc)
+    del doc
+    gc.collect()
+    assert reference() is None
@@ -0,0 +1,33 @@
+import random
+
+import pytest
+import spacy
+
+from util.utils import SpacySingleton, split_text
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_split_text_round_trip(seed):
+    rng = random.Random(seed)
+    text = "".join(rng.choice(["word", " ", ".", "!", "\n", "\n\n", "x" * 30, ";", "\t"]) for _ in range(rng.randint(0, 200)))
+    max_chars = rng.randint(1, 80)
+    chunks = split_text(text, max_chars)
+    assert "".join(chunks) == text
+    assert all(len(chunk) <= max_chars for chunk in chunks)
+    assert all(chunks[:-1])
+
+
+def test_split_text_prefers_paragraphs_and_sentences():
+    text = "One two. Three four.\n\nFive six seven. Eight."
+    assert split_text(text, 25) == ["One two. Three four.\n\n", "Five six seven. Eight."]
+    assert split_text("Short text.", 100) == ["Short text."]
+    assert split_text("A b c d e. f g h i j k", 16) == ["A b c d e. ", "f g h i j k"]
+
+
+def test_chunked_doc_has_offsets_of_whole_text():
+    nlp = spacy.blank("en")
+    text = " ".join(f"Sentence number {i} ends here." + ("\n\n" if i % 7 == 0 else "") for i in range(200))
+    whole = nlp(text)
+    chunked = SpacySingleton._parse_chunked(nlp, text, 500, 16, 1)
+    assert chunked.text == text
+    assert [(token.text, token.idx, token.i) for token in chunked] == [(token.text, token.idx, token.i) for token in whole]
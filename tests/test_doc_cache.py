@@ -0,0 +1,36 @@
+import os
+
+import pytest
+import spacy
+
+from util.doc_cache import DocCache
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    return spacy.blank("en")
+
+
+def test_directory_tier_is_shared_and_bounded(nlp, tmp_path):
+    writer = DocCache(0, str(tmp_path), max_disk_bytes=10 ** 6)
+    keys = [DocCache.key("blank_en", "1.0", (), f"text {i}") for i in range(3)]
+    for i, key in enumerate(keys):
+        writer.put(key, nlp(f"text {i}"))
+    writer.flush()
+
+    reader = DocCache(10 ** 6, str(tmp_path))
+    assert reader.get(keys[0], nlp.vocab).text == "text 0"
+    assert reader.stats()["diskHits"] == 1
+
+    file_size = os.path.getsize(os.path.join(tmp_path, f"{keys[0]}.spacy"))
+    small = DocCache(0, str(tmp_path), max_disk_bytes=3 * file_size)
+    for i in range(3, 10):
+        small.put(DocCache.key("blank_en", "1.0", (), f"text {i}"), nlp(f"text {i}"))
+    small.flush()
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= 3 * file_size
+    assert small.stats()["diskEvictions"] > 0
+
+
+def test_keys_depend_on_model_version():
+    assert DocCache.key("en_core_web_sm", "3.7.0", (), "text") != DocCache.key("en_core_web_sm", "3.7.1", (), "text")
+    assert DocCache.key("en_core_web_sm", "3.7.0", (), "text") == DocCache.key("en_core_web_sm", "3.7.0", (), "text")
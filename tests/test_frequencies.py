@@ -0,0 +1,74 @@
+import random
+
+import numpy as np
+import pytest
+import spacy
+
+from spacy_api.frequencies import SketchCounts, TermCounts
+
+
+@pytest.fixture(scope="module")
+def docs():
+    nlp = spacy.blank("en")
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(2000)]
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(len(words))]
+    texts = [" ".join(rng.choices(words, weights, k=40)) + ", the end." for _ in range(300)]
+    return list(nlp.pipe(texts))
+
+
+def test_exact_counts_filter_stop_words_and_punctuation(docs):
+    counts = TermCounts()
+    for doc in docs[:3]:
+        counts.add(doc)
+    expected = {}
+    for doc in docs[:3]:
+        for token in doc:
+            if not token.is_stop and not token.is_punct:
+                expected[token.text] = expected.get(token.text, 0) + 1
+    assert dict(counts.counts) == expected
+    assert "the" not in counts.counts and "," not in counts.counts
+    assert counts.stats()["records"] == 3
+
+
+def test_merged_exact_counts_equal_one_pass(docs):
+    whole, left, right = TermCounts(), TermCounts(), TermCounts()
+    for i, doc in enumerate(docs):
+        whole.add(doc)
+        (left if i % 2 else right).add(doc)
+    assert left.merge(right).counts == whole.counts
+
+
+def test_sketch_estimates_bound_exact_counts(docs):
+    exact, sketch = TermCounts(), SketchCounts(width=2 ** 10, depth=4, capacity=20)
+    for doc in docs:
+        exact.add(doc)
+        sketch.add(doc)
+    keys = [doc.vocab.strings[term] for term in exact.counts]
+    estimates = sketch.estimate(np.array(keys, dtype=np.uint64))
+    errors = estimates - np.array(list(exact.counts.values()))
+    assert (errors >= 0).all()
+    assert errors.max() <= sketch.stats()["maxError"]
+    assert [term for term, _ in sketch.most_common(5)] == [term for term, _ in exact.most_common(5)]
+    assert len(sketch.candidates) <= 2 * sketch.capacity
+
+
+def test_merged_sketches_equal_one_pass(docs):
+    whole, left, right = SketchCounts(2 ** 8, 3, 10), SketchCounts(2 ** 8, 3, 10), SketchCounts(2 ** 8, 3, 10)
+    for i, doc in enumerate(docs):
+        whole.add(doc)
+        (left if i % 2 else right).add(doc)
+    merged = left.merge(right)
+    assert (merged.table == whole.table).all()
+    assert merged.total == whole.total and merged.records == whole.records
+    assert merged.most_common(5) == whole.most_common(5)
+
+
+def test_sketch_shapes():
+    with pytest.raises(ValueError):
+        SketchCounts(width=0)
+    with pytest.raises(ValueError):
+        SketchCounts(depth=0)
+    with pytest.raises(ValueError):
+        SketchCounts(2 ** 8).merge(SketchCounts(2 ** 9))
+    assert SketchCounts().most_common(3) == []
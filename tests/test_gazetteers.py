@@ -0,0 +1,55 @@
+import pytest
+
+from spacy_api.extractors import check_params
+from spacy_api.gazetteers import GazetteerStore
+
+
+def test_register_find_delete(tmp_path):
+    pytest.importorskip("flashtext")
+    store = GazetteerStore(str(tmp_path))
+    info = store.register(["Max", "Kern AI", "Kern AI", "Zoë"])
+    assert info["entries"] == 3
+    assert store.register(["Max", "Kern AI", "Zoë"])["id"] == info["id"]
+    assert store.find(info["id"], "Max joined Kern AI with Zoë, not Maxime.") == [(0, 3), (11, 18), (24, 27)]
+
+    other_worker = GazetteerStore(str(tmp_path))
+    assert other_worker.find(info["id"], "Max") == [(0, 3)]
+    store.delete(info["id"])
+    with pytest.raises(KeyError):
+        other_worker.find(info["id"], "Max")
+
+
+def test_offsets_of_characters_longer_when_lowercased(tmp_path):
+    pytest.importorskip("flashtext")
+    store = GazetteerStore(str(tmp_path))
+    text = "İİ Max and Kern AI"
+    for case_sensitive in (False, True):
+        gazetteer_id = store.register(["Max", "Kern AI"], case_sensitive)["id"]
+        assert [text[start:end] for start, end in store.find(gazetteer_id, text)] == ["Max", "Kern AI"]
+    gazetteer_id = store.register(["İstanbul"])["id"]
+    assert store.find(gazetteer_id, "from İSTANBUL to İstanbul") == [(5, 13), (17, 25)]
+
+
+def test_unknown_ids(tmp_path):
+    store = GazetteerStore(str(tmp_path))
+    for gazetteer_id in ("0123abcd", "../etc"):
+        with pytest.raises(KeyError):
+            store.get(gazetteer_id)
+
+
+def test_check_params():
+    check_params("gazetteer", {"lookup_values": ["Max"]})
+    with pytest.raises(TypeError):
+        check_params("registered_gazetteer", {})
+    with pytest.raises(TypeError):
+        check_params("email", {"unknown": 1})
+
+
+def test_check_params_coerces_types_and_hides_internal_params():
+    assert check_params("window_search", {"window_size": "6"}) == {"window_size": 6}
+    assert check_params("email") == {}
+    for name, params in [("email", {"matches": {}}),
+                         ("window_search", {"window_size": "six"}),
+                         ("gazetteer", {"lookup_values": "Max"})]:
+        with pytest.raises(TypeError):
+            check_params(name, params)
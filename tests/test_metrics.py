@@ -0,0 +1,34 @@
+import time
+
+from util import metrics
+from util.executor import Executor
+
+
+def staged_work(value: int) -> int:
+    with metrics.stage("parse"):
+        time.sleep(0.01)
+    return value * 2
+
+
+def stage_count(stage: str) -> int:
+    return sum(sum(counts) for (_, name), (counts, _) in metrics.STAGE_LATENCY.values.items() if name == stage)
+
+
+def test_collected_stages_are_not_recorded_in_place():
+    before = stage_count("parse")
+    with metrics.collect_stages() as stages:
+        assert staged_work(2) == 4
+    assert [name for name, _ in stages] == ["parse"]
+    assert stage_count("parse") == before
+    metrics.record_stages(stages)
+    assert stage_count("parse") == before + 1
+
+
+def test_process_pool_stages_reach_the_server_metrics():
+    executor = Executor("process", 1, 2)
+    try:
+        before = stage_count("parse")
+        assert executor.execute(staged_work, 3) == 6
+        assert stage_count("parse") == before + 1
+    finally:
+        executor.shutdown()
@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+from spacy_api.patterns import PATTERNS, Scanner, scan
+
+TEXTS = [
+    "",
+    "I live at 35 Wood Lane, Pilsbury ME19 7DY, United Kingdom. But I have also lived at 221BE Baker-callum Street, London.",
+    "Colors #fff, #a1b2c3d4, rgb(1, 2, 3) and hsla(10, 20%, 30%, 0.5) or hwb(1 2 3).",
+    "Meet me on 05.11.2022 at 10:30 a.m. or Jan 5 2023, 4pm.",
+    "Pay DE89 3704 0044 0532 0130 00 via BIC DEUTDEFFXXX with card 4111 1111 1111 1111.",
+    "Ping 192.168.0.1, 99% done, -3,5 % off, call +(123) 456-7890.",
+    "Contact johannes.hoetter@kern.ai at https://kern.ai/#hashtag and 'quoted' \"text\".",
+]
+
+
+def random_text(rng: random.Random) -> str:
+    pieces = ["#abc", "rgb(", ")", "12", ":", "30", ".", " ", "@", "kern.ai", "'", '"', "%", "Street", ",", "DE89", "0044"]
+    return "".join(rng.choice(pieces) for _ in range(rng.randint(0, 40)))
+
+
+@pytest.mark.parametrize("text", TEXTS + [random_text(random.Random(seed)) for seed in range(200)])
+def test_scan_equals_finditer(text):
+    names = tuple(PATTERNS)
+    matches = Scanner(names).scan(text)
+    for name in names:
+        expected = [(match.start(), match.end(), match.groups()) for match in PATTERNS[name].finditer(text)]
+        assert [(match.start(), match.end(), match.groups()) for match in matches[name]] == expected, name
+
+
+def test_scan_subset_and_duplicates():
+    text = TEXTS[6]
+    matches = scan(text, ["email", "url", "email"])
+    assert list(matches) == ["email", "url"]
+    assert [match.group() for match in matches["email"]] == ["johannes.hoetter@kern.ai"]
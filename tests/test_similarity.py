@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import manhattan_distances, pairwise_distances
+
+from sklearn_api.similarity import pairwise, shared_minimum
+
+
+@pytest.mark.parametrize("budget", [1, 7, 100, 10 ** 6])
+def test_shared_minimum_gives_manhattan_distances(budget):
+    x = sp.random(13, 40, density=0.3, format="csr", random_state=1)
+    y = sp.random(17, 40, density=0.5, format="csr", random_state=2)
+    norms = np.asarray(x.sum(axis=1)) + np.asarray(y.sum(axis=1)).ravel()
+    assert np.allclose(norms - 2 * shared_minimum(x, y, budget), manhattan_distances(x, y))
+
+
+def test_shared_minimum_without_shared_terms():
+    x = sp.csr_matrix(np.array([[1.0, 0.0], [0.0, 0.0]]))
+    y = sp.csr_matrix(np.array([[0.0, 2.0]]))
+    assert (shared_minimum(x, y, 10) == 0).all()
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(200)]
+    texts = [" ".join(rng.choices(words, k=8)) for _ in range(40)]
+    texts2 = [" ".join(rng.choices(words, k=8)) for _ in range(30)]
+    vectors = TfidfVectorizer().fit_transform(texts + texts2).toarray()
+    return texts, texts2, vectors[:40], vectors[40:]
+
+
+def reference(metric, x, y):
+    return x @ y.T if metric == "cosine" else pairwise_distances(x, y, metric=metric)
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean", "manhattan"])
+def test_matrix(corpus, metric):
+    texts, texts2, x, y = corpus
+    assert np.allclose(pairwise(texts, texts2, metric)["matrix"], reference(metric, x, y))
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean", "manhattan"])
+def test_top_k(corpus, metric):
+    texts, texts2, x, y = corpus
+    expected = reference(metric, x, y)
+    for i, row in enumerate(pairwise(texts, texts2, metric, k=3)["topK"]):
+        best = np.sort(expected[i])[::-1][:3] if metric == "cosine" else np.sort(expected[i])[:3]
+        assert np.allclose([value for _, value in row], best)
+        assert all(np.isclose(expected[i, column], value) for column, value in row)
+
+
+@pytest.mark.parametrize("metric, threshold", [("cosine", 0.1), ("euclidean", 1.2), ("manhattan", 4.0)])
+def test_threshold_pairs(corpus, metric, threshold):
+    texts, texts2, x, y = corpus
+    expected = reference(metric, x, y)
+    passing = expected >= threshold if metric == "cosine" else expected <= threshold
+    found = pairwise(texts, texts2, metric, threshold=threshold)["pairs"]
+    assert {(row, column) for row, column, _ in found} == set(zip(*np.nonzero(passing)))
+
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean", "manhattan"])
+def test_self_comparison_skips_diagonal(corpus, metric):
+    texts = corpus[0]
+    assert all(column != row for row, neighbours in enumerate(pairwise(texts, None, metric, k=2)["topK"])
+               for column, _ in neighbours)
+    threshold = 0.0 if metric == "cosine" else 100.0
+    assert all(row != column for row, column, _ in pairwise(texts, None, metric, threshold=threshold)["pairs"])
+    assert len(pairwise(texts, None, metric)["matrix"]) == len(texts)
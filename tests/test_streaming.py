@@ -0,0 +1,21 @@
+import pytest
+
+from util.streaming import parse_record
+
+
+def test_parse_record():
+    assert parse_record(b'"plain text"', 3) == (3, "plain text")
+    assert parse_record(b'{"id": "a", "text": "hi"}', 3) == ("a", "hi")
+    assert parse_record(b'{"text": "hi"}', 3) == (3, "hi")
+
+
+@pytest.mark.parametrize("line, error", [
+    (b'{"id": 1}', KeyError),
+    (b'{"text": null}', TypeError),
+    (b'{"text": 5}', TypeError),
+    (b'[1, 2]', TypeError),
+    (b'{"text": ', ValueError),
+])
+def test_invalid_records(line, error):
+    with pytest.raises(error):
+        parse_record(line, 0)
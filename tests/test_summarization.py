@@ -0,0 +1,31 @@
+import pytest
+import spacy
+
+from spacy_api.summarization import Summarizer, summarize_chunks
+from util.utils import LangEnum, SpacySingleton
+
+TEXT = ("Mars is the fourth planet. Mars has two moons. The sun is a star. "
+        "Planet Mars is red because of iron. Nothing else.")
+
+
+@pytest.fixture(scope="module")
+def nlp():
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+def test_summary_length(nlp):
+    summarizer = Summarizer("en").add(nlp(TEXT))
+    assert summarizer.summary(-1) == ""
+    assert summarizer.summary(0) == ""
+    assert summarizer.summary(0.2) == "Planet Mars is red because of iron."
+    assert summarizer.summary(1).startswith("Planet Mars is red because of iron. Mars is the fourth planet.")
+
+
+def test_chunks_give_the_summary_of_the_whole_text(nlp, monkeypatch):
+    monkeypatch.setattr(SpacySingleton, "get_nlp", classmethod(lambda cls, lang, exclude=(): nlp))
+    chunks = ["Mars is the fourth planet. Mars has two moons. ", "The sun is a star. ",
+              "Planet Mars is red because of iron. Nothing else."]
+    expected = Summarizer("en").add(nlp(TEXT)).summary(0.6)
+    assert summarize_chunks(LangEnum.EN, iter(chunks), 0.6, batch_size=2) == {"summary": expected}
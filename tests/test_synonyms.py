@@ -0,0 +1,18 @@
+from nltk_api.synonyms import synonym_matcher
+
+
+def spans(words, text):
+    return [match.span() for match in synonym_matcher(tuple(words)).finditer(text)]
+
+
+def test_whole_words_only():
+    assert spans(["ball", "football"], "football and a ball, balls") == [(0, 8), (15, 19)]
+
+
+def test_longest_word_wins():
+    assert spans(["association", "association football"], "association football") == [(0, 20)]
+    assert spans(["association", "association football"], "association footballer") == [(0, 11)]
+
+
+def test_no_words():
+    assert synonym_matcher(()) is None
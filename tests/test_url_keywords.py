@@ -0,0 +1,16 @@
+from nltk_api import UrlKeywordBatchRequest, normalize_white_list, url_keyword_parser, url_keyword_parser_batch
+
+URL = "https://www.kern.ai/pricing/the-plans?plan=team"
+
+
+def test_normalize_white_list():
+    assert normalize_white_list([" The ", "PLANS", "", "  "]) == frozenset({"the", "plans"})
+
+
+def test_single_and_batch_routes_agree():
+    single = url_keyword_parser(URL, True, True, True, False, False, True, ", ", "\\W", " The , Plans ")
+    batch = url_keyword_parser_batch(UrlKeywordBatchRequest(urls=[URL, URL],
+                                                            removeStopwords=False,
+                                                            wordWhiteList=[" The ", " Plans "]))
+    assert batch == {"results": [single, single]}
+    assert set(single.split(", ")) == {"www", "kern", "ai", "pricing", "the", "plans", "plan", "team"}
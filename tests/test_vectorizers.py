@@ -0,0 +1,41 @@
+import os
+
+import numpy as np
+import pytest
+
+from sklearn_api.vectorizers import HASHING_ID, MAX_FEATURES, VectorizerStore
+
+TEXTS = ["Ten amazing facts about planet Mars.", "Ten amazing facts about the sun", "The quick brown fox."]
+
+
+@pytest.mark.parametrize("hashing", [False, True])
+def test_register_transform_delete(tmp_path, hashing):
+    store = VectorizerStore(str(tmp_path))
+    info = store.register(TEXTS, hashing, n_features=2 ** 10)
+    assert store.register(TEXTS, hashing, n_features=2 ** 10)["id"] == info["id"]
+    assert sorted(os.listdir(tmp_path)) == [f"{info['id']}.joblib", f"{info['id']}.json"]
+
+    other_worker = VectorizerStore(str(tmp_path))
+    vectors = other_worker.transform(info["id"], TEXTS)
+    assert np.allclose((vectors - store.transform(info["id"], TEXTS)).toarray(), 0)
+    store.delete(info["id"])
+    with pytest.raises(KeyError):
+        other_worker.transform(info["id"], TEXTS)
+
+
+def test_unknown_ids(tmp_path):
+    store = VectorizerStore(str(tmp_path))
+    for vectorizer_id in ("0123abcd", "../etc"):
+        with pytest.raises(KeyError):
+            store.get(vectorizer_id)
+    with pytest.raises(KeyError):
+        store.delete(HASHING_ID)
+    assert store.transform(HASHING_ID, TEXTS).shape == (3, 2 ** 20)
+
+
+def test_n_features_limit(tmp_path):
+    store = VectorizerStore(str(tmp_path))
+    for n_features in (0, MAX_FEATURES + 1):
+        with pytest.raises(ValueError):
+            store.register(TEXTS, True, n_features)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,43 @@
+import pytest
+import spacy
+from spacy.tokens import Doc
+
+from spacy_api.windows import chunk_windows, window_search
+
+
+@pytest.fixture(scope="module")
+def doc():
+    words = ["Max", "Mustermann", "joined", "Kern", "AI", ".", "He", "builds", "great", "software"]
+    spaces = [True, True, True, True, False, True, True, True, True, False]
+    heads = [1, 2, 2, 4, 2, 2, 7, 7, 9, 7]
+    deps = ["compound", "nsubj", "ROOT", "compound", "dobj", "punct", "nsubj", "ROOT", "amod", "dobj"]
+    pos = ["PROPN", "PROPN", "VERB", "PROPN", "PROPN", "PUNCT", "PRON", "VERB", "ADJ", "NOUN"]
+    return Doc(spacy.blank("en").vocab, words=words, spaces=spaces, heads=heads, deps=deps, pos=pos)
+
+
+def baseline_windows(doc, window_size):
+    """The windows as the route computed them per chunk, with Span objects."""
+    for chunk in doc.noun_chunks:
+        left = max(chunk.sent.start, chunk.start - (window_size // 2) + 1)
+        right = min(chunk.sent.end, chunk.end + (window_size // 2) + 1)
+        yield chunk, doc[left:right]
+
+
+@pytest.mark.parametrize("window_size", range(-6, 12))
+def test_windows_match_spans(doc, window_size):
+    windows = chunk_windows(doc, window_size)
+    expected = list(baseline_windows(doc, window_size))
+    assert len(windows) == len(expected) == 4
+    for window, (chunk, span) in zip(windows, expected):
+        assert window.chunk == chunk
+        assert doc.text[window.char_start:window.char_end] == span.text
+        assert window.start <= window.end
+
+
+@pytest.mark.parametrize("window_size", range(-6, 12))
+@pytest.mark.parametrize("terms", [("joined",), ("Kern AI", "software"), ("n A",), ("",), ("nowhere",), (".",)])
+def test_window_search_matches_substring_search(doc, window_size, terms):
+    found = [(window.chunk.start, window.chunk.end) for window in window_search(doc, terms, window_size)]
+    expected = [(chunk.start, chunk.end) for chunk, span in baseline_windows(doc, window_size)
+                if any(term in span.text for term in terms)]
+    assert found == expected
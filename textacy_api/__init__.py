@@ -1,13 +1,13 @@
 import re
 from typing import Optional
 
-import textacy
 from fastapi import APIRouter
 from fastapi import Form
 
+from util.profiling import ProfilingRoute
 from util.utils import LangEnum, SpacySingleton
 
-router = APIRouter()
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/verb_phrase_extraction/",
              summary="Extracts the verb phrases from a record.",
@@ -24,6 +24,8 @@ router = APIRouter()
 def verb_phrase_extraction(text: Optional[str] = Form("In the next section, we will build a new model which is more accurate than the previous one."),
                            lang: Optional[LangEnum] = Form(LangEnum.EN)):
 
+    import textacy
+
     patterns = [{"POS": "AUX"}, {"POS": "VERB"}]
     doc = textacy.make_spacy_doc(text, lang=lang.value)
     verb_phrase = textacy.extract.token_matches(doc, patterns=patterns)
@@ -8,9 +8,12 @@ from json import JSONDecodeError
 import re
 from textblob import TextBlob
 
+from spacy_api.windows import chunk_windows
+from util.executor import execute
+from util.profiling import ProfilingRoute
 from util.utils import LangEnum, SpacySingleton
 
-router = APIRouter()
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/textblob_spelling_correction/",
              summary="Correct spelling mistakes in a text using the TextBlob library.",
@@ -43,22 +46,28 @@ def aspect_extraction(text: Optional[str] = Form("It has a really great battery
 
     matches = []
     if text:
-        nlp = SpacySingleton.get_nlp(lang)
-        doc = nlp(text)
-
-        for chunk in doc.noun_chunks:
-            left_bound = max(chunk.sent.start, chunk.start - (windows_size // 2) + 1)
-            right_bound = min(chunk.sent.end, chunk.end + (windows_size // 2) + 1)
-            window_doc = doc[left_bound:right_bound]
-            sentiment = TextBlob(window_doc.text).polarity
-            if sentiment < -(1 - sensitivity):
-                matches.append(["negative", chunk.start, chunk.end])
-            elif sentiment > (1 - sensitivity):
-                matches.append(["positive", chunk.start, chunk.end])
-
+        matches = execute(extract_aspects, lang, text, windows_size, sensitivity)
     return {"aspects": matches}
 
 
+def extract_aspects(lang: LangEnum, text: str, windows_size: int, sensitivity: float):
+    doc = SpacySingleton.get_doc(lang, text)
+
+    # overlapping chunks often share a window, its polarity is computed once
+    polarities = {}
+    matches = []
+    for window in chunk_windows(doc, windows_size):
+        window_text = doc.text[window.char_start:window.char_end]
+        if window_text not in polarities:
+            polarities[window_text] = TextBlob(window_text).polarity
+        sentiment = polarities[window_text]
+        if sentiment < -(1 - sensitivity):
+            matches.append(["negative", window.chunk.start, window.chunk.end])
+        elif sentiment > (1 - sensitivity):
+            matches.append(["positive", window.chunk.start, window.chunk.end])
+    return matches
+
+
 @router.post("/textblob_sentiment/",
              summary="Calculate sentiment of a text.",
              description=
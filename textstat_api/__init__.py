@@ -7,9 +7,12 @@ from json import JSONDecodeError
 import re
 import textstat
 
+from util.alignment import labeled_spans
+from util.executor import execute
+from util.profiling import ProfilingRoute
 from util.utils import LangEnum, SpacySingleton
 
-router = APIRouter()
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/chunked_sentence_complexity/",
              summary="Chunks a text and calculates complexity of it.",
@@ -25,12 +28,7 @@ def chunked_sentence_complexity(text: Optional[str] = Form("Wow, this is really
 
     complexity = "none"
     if text:
-        textstat.set_lang(lang.name.lower())
-
-        nlp = SpacySingleton.get_nlp(lang) # defaults to "en_core_web_sm"
-        doc = nlp(text)
-
-        complexities = [textstat.flesch_reading_ease(sent.text) for sent in doc.sents]
+        complexities = execute(sentence_complexities, lang, text)
 
         avg = int(round(sum(complexities) / len(complexities)))
         complexity = get_mapping_complexity(avg)
@@ -51,15 +49,17 @@ def maximum_sentence_complexity(text: Optional[str] = Form("An easy sentence. De
 
     complexity = "none"
     if text:
-        textstat.set_lang(lang.name.lower())
-        nlp = SpacySingleton.get_nlp(lang) # defaults to "en_core_web_sm"
-        doc = nlp(text)
-
-        complexities = [textstat.flesch_reading_ease(sent.text) for sent in doc.sents]
+        complexities = execute(sentence_complexities, lang, text)
         complexity = get_mapping_complexity(min(complexities))
     return {"overall_text_complexity": complexity}
 
 
+def sentence_complexities(lang: LangEnum, text: str):
+    textstat.set_lang(lang.name.lower())
+    doc = SpacySingleton.get_doc(lang, text) # defaults to "en_core_web_sm"
+    return [textstat.flesch_reading_ease(sent.text) for sent in doc.sents]
+
+
 def get_mapping_complexity(score):
     if score < 30:
         return "very difficult"
@@ -90,20 +90,15 @@ def difficult_words_extraction(text: Optional[str] = Form("My cat is eleven year
                                syllable_threshold: int = Form(3),
                                your_label: str = Form("difficult_word")):
 
-    nlp = SpacySingleton.get_nlp(lang)
-    doc = nlp(text)
+    doc = SpacySingleton.get_doc(lang, text, tokenizer_only=True)
 
     syllable_threshold = syllable_threshold
     difficult_words = textstat.difficult_words_list(text, syllable_threshold)
 
     pattern = "|".join(difficult_words)
-    difficult_words = []
-    for match in re.finditer(pattern, text):
-        start, end = match.span()
-        span = doc.char_span(start, end, alignment_mode="expand")
-        difficult_words.append([your_label, span.start, span.end])
+    char_spans = [match.span() for match in re.finditer(pattern, text)]
 
-    return {f"{your_label}s": difficult_words}
+    return {f"{your_label}s": labeled_spans(doc, your_label, char_spans)}
 
 
 @router.post("/syllable_count/",
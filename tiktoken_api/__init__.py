@@ -1,10 +1,12 @@
+from functools import lru_cache
 from typing import Optional
 
-import tiktoken
 from fastapi import APIRouter
 from fastapi import Form
 
-router = APIRouter()
+from util.profiling import ProfilingRoute
+
+router = APIRouter(route_class=ProfilingRoute)
 
 @router.post("/tiktoken_length_classifier/",
              summary="Uses the Tiktoken library to count tokens in a string.",
@@ -18,7 +20,7 @@ router = APIRouter()
 def tiktoken_length_classifier(text: Optional[str] = Form('The sun is shining bright today.'),
                                encoding_model: str = Form("cl100k_base")):
 
-    encoding = tiktoken.get_encoding(encoding_model)
+    encoding = get_encoding(encoding_model)
     tokens = encoding.encode(text)
     num_tokens = len(tokens)
 
@@ -42,6 +44,13 @@ def tiktoken_length_classifier(text: Optional[str] = Form('The sun is shining br
 def tiktoken_token_counter(text: Optional[str] = Form('What a beautiful day to count tokens.'),
                            encoding_model: str = Form("cl100k_base")):
 
-    encoding = tiktoken.get_encoding(encoding_model)
+    encoding = get_encoding(encoding_model)
     tokens = encoding.encode(text)
-    return {"token_length": len(tokens)}
\ No newline at end of file
+    return {"token_length": len(tokens)}
+
+
+@lru_cache(maxsize=8)
+def get_encoding(encoding_model: str):
+    import tiktoken
+
+    return tiktoken.get_encoding(encoding_model)
@@ -0,0 +1,66 @@
+import threading
+import weakref
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from spacy.attrs import IDX, LENGTH
+
+
+class TokenAlignment:
+    """Maps character ranges of a Doc's text to token ranges.
+
+    Built once per Doc from the token offsets; many ranges are aligned with one
+    ``searchsorted`` call and without creating Span objects. Ranges align like
+    ``doc.char_span(start, end, alignment_mode="expand")``: a range starting in whitespace
+    starts at the next token, one ending in whitespace ends after the previous token, and
+    ranges of whitespace only cover no token.
+    """
+
+    def __init__(self, doc):
+        self.length = len(doc.text)
+        offsets = doc.to_array([IDX, LENGTH]).reshape(-1, 2).astype(np.int64)
+        self.idx = offsets[:, 0]
+        self.token_ends = offsets[:, 0] + offsets[:, 1]
+
+    def align(self, starts: Iterable[int], ends: Iterable[int]):
+        """Returns token starts, token ends and a mask of the ranges that cover at least one token."""
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        # first token ending after the start, last token starting before the end
+        token_starts = np.searchsorted(self.token_ends, starts, side="right")
+        token_ends = np.searchsorted(self.idx, ends - 1, side="right")
+        valid = (starts >= 0) & (starts < ends) & (ends <= self.length) & (token_ends > token_starts)
+        return token_starts, token_ends, valid
+
+
+# alignments live exactly as long as their Doc, so cached Docs take theirs along when evicted
+_alignments = weakref.WeakKeyDictionary()
+_alignments_lock = threading.Lock()
+
+
+def get_alignment(doc) -> TokenAlignment:
+    """Returns the alignment index of a Doc, built once per Doc."""
+    with _alignments_lock:
+        alignment = _alignments.get(doc)
+    if alignment is None:
+        alignment = TokenAlignment(doc)
+        with _alignments_lock:
+            _alignments[doc] = alignment
+    return alignment
+
+
+def token_spans(doc, char_spans: List[Tuple[int, int]]) -> List[Optional[Tuple[int, int]]]:
+    """Token (start, end) for each character (start, end); None where no token is covered."""
+    if not char_spans:
+        return []
+    starts, ends = zip(*char_spans)
+    token_starts, token_ends, valid = get_alignment(doc).align(starts, ends)
+    return [
+        (start, end) if ok else None
+        for start, end, ok in zip(token_starts.tolist(), token_ends.tolist(), valid.tolist())
+    ]
+
+
+def labeled_spans(doc, label: str, char_spans: List[Tuple[int, int]]) -> List[list]:
+    """``[label, token start, token end]`` for every character range that covers a token."""
+    return [[label, span[0], span[1]] for span in token_spans(doc, char_spans) if span is not None]
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import spacy
+from spacy.tokens import DocBin
+
+# rough per token footprint of a Doc (TokenC struct, lexeme pointers, morph/ent data)
+TOKEN_BYTES = 200
+# Docs waiting to be written to the directory; beyond that, writes are dropped
+MAX_PENDING_WRITES = 64
+# share of the directory budget left filled when files are evicted, so a full directory is
+# not scanned again on every write
+DISK_LOW_WATERMARK = 0.9
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+
+def doc_size(doc) -> int:
+    """Estimates the memory held by a Doc, including its tensor."""
+    tensor = getattr(doc, "tensor", None)
+    return sys.getsizeof(doc.text) + len(doc) * TOKEN_BYTES + (getattr(tensor, "nbytes", 0) or 0)
+
+
+class DocCache:
+    """Content-addressed LRU cache of parsed Docs with a byte budget.
+
+    Entries are keyed by model name and version, spaCy version, pipeline configuration and
+    a hash of the text. If ``directory`` is set, Docs are additionally written there as
+    DocBin files so other workers on the same machine (e.g. with a directory on /dev/shm)
+    can reuse them. Files are written by a background thread, off the request path, and
+    the least recently used ones are removed once the directory holds more than
+    ``max_disk_bytes``; the directory size is rescanned whenever this process's own writes
+    since the last scan would exceed it. Cached Docs are shared between callers and must be
+    treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int, directory: Optional[str] = None, max_disk_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        # bytes in the directory at the last scan plus the ones written by this process since
+        self.disk_size = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.dropped_writes = 0
+        self._pending = 0
+        self._writer = None
+        self._writer_pid = None
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(model: str, version: str, config: Iterable[str], text: str) -> str:
+        """Cache key of a text parsed by version ``version`` of pipeline ``model`` with the given components."""
+        return f"{model}-{version}-{spacy.__version__}-{'+'.join(config) or 'full'}-{text_hash(text)}"
+
+    def get(self, key: str, vocab):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        doc = self._read(key, vocab)
+        with self._lock:
+            if doc is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._insert(key, doc)
+        return doc
+
+    def put(self, key: str, doc):
+        self._insert(key, doc)
+        if self.directory and self.max_disk_bytes:
+            self._submit_write(key, doc)
+
+    def _insert(self, key: str, doc):
+        size = doc_size(doc)
+        if not self.max_bytes or size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self.entries[key] = (doc, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.spacy")
+
+    def _read(self, key: str, vocab):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # the mtime orders the files for eviction
+            os.utime(path)
+        except OSError:
+            return None
+        docs = list(DocBin(store_user_data=True).from_bytes(data).get_docs(vocab))
+        return docs[0] if docs else None
+
+    def _submit_write(self, key: str, doc):
+        with self._lock:
+            if self._pending >= MAX_PENDING_WRITES:
+                self.dropped_writes += 1
+                return
+            self._pending += 1
+            # a forked worker process inherits the executor but not its thread
+            if self._writer is None or self._writer_pid != os.getpid():
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="doc-cache-writer")
+                self._writer_pid = os.getpid()
+            writer = self._writer
+        writer.submit(self._write, key, doc)
+
+    def _write(self, key: str, doc):
+        try:
+            data = DocBin(docs=[doc], store_user_data=True).to_bytes()
+            if len(data) > self.max_disk_bytes:
+                return
+            path = self._path(key)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            if self.disk_size is None:
+                self._evict_files()
+            else:
+                self.disk_size += len(data)
+                if self.disk_size > self.max_disk_bytes:
+                    self._evict_files()
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _evict_files(self):
+        """Scans the directory and removes the least recently used files beyond the budget."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".spacy"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(file_size for _, file_size, _ in files)
+        if size > self.max_disk_bytes:
+            for _, file_size, path in sorted(files):
+                if size <= self.max_disk_bytes * DISK_LOW_WATERMARK:
+                    break
+                try:
+                    os.remove(path)
+                    self.disk_evictions += 1
+                except FileNotFoundError:
+                    pass
+                size -= file_size
+        self.disk_size = size
+
+    def flush(self):
+        """Waits until the Docs put so far are written to the directory."""
+        with self._lock:
+            writer = self._writer if self._writer_pid == os.getpid() else None
+        if writer is not None:
+            writer.submit(lambda: None).result()
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "maxBytes": self.max_bytes,
+                "directory": self.directory,
+                "diskBytes": self.disk_size or 0,
+                "maxDiskBytes": self.max_disk_bytes,
+                "hits": self.hits,
+                "diskHits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "diskEvictions": self.disk_evictions,
+                "droppedWrites": self.dropped_writes,
+            }
@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fastapi import HTTPException
+
+from util import metrics, profiling
+from util.utils import SpacySingleton, env_int
+
+
+def _init_worker():
+    # pool workers parse inline, nlp.pipe must not start process pools of its own in them
+    SpacySingleton.max_processes = 1
+    SpacySingleton.chunk_processes = 1
+    SpacySingleton.preload()
+
+
+def _call(func, args, kwargs, submitted: float):
+    started = time.time()
+    with metrics.collect_stages() as stages:
+        result = func(*args, **kwargs)
+    return result, started - submitted, stages
+
+
+class Executor:
+    """Runs CPU bound handler work, either inline or in a pool of warm worker processes.
+
+    ``BRICKS_EXECUTOR=process`` moves the work off the event loop's process, so parsing does
+    not compete for the GIL of the server. Workers are spawned on first use with
+    ``BRICKS_PROCESS_WORKERS`` processes (defaults to the CPU count) and preload the
+    ``SPACY_PRELOAD`` pipelines. At most ``BRICKS_MAX_QUEUE`` calls are in flight; more are
+    rejected with 429 instead of piling up. Only the arguments and the result of a call are
+    pickled, so handlers pass the text and get the compact result back, never a Doc. The
+    stage durations (parse, extract, ...) measured in a worker come back with the result and
+    are recorded in the server's metrics; pipelines preloaded at worker start are not.
+    """
+
+    def __init__(self, backend: str, workers: int, max_queue: int):
+        self.backend = backend
+        self.workers = workers
+        self.max_queue = max_queue
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(max_queue)
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_worker)
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def execute(self, func, *args, **kwargs):
+        """Calls ``func(*args, **kwargs)``; ``func`` must be importable by the worker processes."""
+        # profiled requests run inline, the sampler only sees the threads of this process
+        if self.backend != "process" or profiling.current() is not None:
+            return func(*args, **kwargs)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(status_code=429, detail="Too many requests in flight, retry later.", headers={"Retry-After": "1"})
+
+        pool = self._get_pool()
+        with self._lock:
+            self.submitted += 1
+        try:
+            result, wait, stages = pool.submit(_call, func, args, kwargs, time.time()).result()
+        except BrokenProcessPool:
+            self._reset_pool(pool)
+            raise HTTPException(status_code=503, detail="Worker process died, retry later.")
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.completed += 1
+
+        with self._lock:
+            self.queue_wait += wait
+            self.max_queue_wait = max(self.max_queue_wait, wait)
+        metrics.record_stages(stages)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "workers": self.workers if self.backend == "process" else 0,
+                "maxQueue": self.max_queue,
+                "inFlight": self.submitted - self.completed,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+                "queueWaitTotal": round(self.queue_wait, 4),
+                "maxQueueWait": round(self.max_queue_wait, 4),
+            }
+
+
+_workers = env_int("BRICKS_PROCESS_WORKERS", os.cpu_count() or 1)
+executor = Executor(os.environ.get("BRICKS_EXECUTOR", "thread").lower(),
+                    _workers,
+                    env_int("BRICKS_MAX_QUEUE", 4 * _workers))
+
+
+def execute(func, *args, **kwargs):
+    return executor.execute(func, *args, **kwargs)
@@ -0,0 +1,66 @@
+import bisect
+import fcntl
+import mmap
+import os
+from typing import Callable, Iterable
+
+import numpy as np
+
+from util.utils import data_dir
+
+
+class Lexicon:
+    """Read-only set of words stored as a sorted string table and memory-mapped.
+
+    ``<name>.bin`` holds the UTF-8 encoded words in byte order without separators and
+    ``<name>.offsets.npy`` the start of every word (plus the end of the last one). Lookups are
+    a binary search over the mapped pages, so the table is loaded lazily by the OS and its
+    pages are shared by every process of the box that maps the same files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offsets = np.load(f"{path}.offsets.npy", mmap_mode="r")
+        with open(f"{path}.bin", "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        return self.data[int(self.offsets[index]):int(self.offsets[index + 1])]
+
+    def __contains__(self, word: str) -> bool:
+        key = word.encode("utf-8")
+        index = bisect.bisect_left(self, key)
+        return index < len(self) and self[index] == key
+
+    @staticmethod
+    def build(path: str, words: Iterable[str]):
+        """Writes the table of the given words; the files are replaced atomically."""
+        table = sorted({word.encode("utf-8") for word in words if word})
+        offsets = np.zeros(len(table) + 1, dtype=np.int64)
+        np.cumsum([len(word) for word in table], out=offsets[1:])
+
+        pid = os.getpid()
+        with open(f"{path}.bin.{pid}.tmp", "wb") as f:
+            f.write(b"".join(table))
+        with open(f"{path}.offsets.{pid}.tmp", "wb") as f:
+            np.save(f, offsets)
+        # the offsets are renamed last, their presence marks a complete table
+        os.replace(f"{path}.bin.{pid}.tmp", f"{path}.bin")
+        os.replace(f"{path}.offsets.{pid}.tmp", f"{path}.offsets.npy")
+
+    @classmethod
+    def load(cls, name: str, words: Callable[[], Iterable[str]]) -> "Lexicon":
+        """Maps the lexicon ``name`` from the data directory, building it from ``words()`` once.
+
+        Concurrent workers wait on a file lock for the first one to build the table.
+        """
+        path = os.path.join(data_dir("lexicons"), name)
+        if not os.path.exists(f"{path}.offsets.npy"):
+            with open(f"{path}.lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if not os.path.exists(f"{path}.offsets.npy"):
+                    cls.build(path, words())
+        return cls(path)
@@ -0,0 +1,190 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from util import profiling
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    # Metrics are kept per process; with several gunicorn workers every scrape sees the worker
+    # that answers it, told apart by the pid label.
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.append(f'pid="{os.getpid()}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # per label set: bucket counts (the last one is +Inf), sum
+        self.values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.values.get(labels)
+            if entry is None:
+                entry = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in self.values.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(float(bound))
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), labels + (le,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total[0]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram("bricks_request_duration_seconds", "Time from receiving a request to sending the last byte of its response.", ("route", "method", "status"))
+REQUEST_SIZE = Histogram("bricks_request_size_bytes", "Content-Length of the requests.", ("route",), SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram("bricks_response_size_bytes", "Content-Length of the responses.", ("route",), SIZE_BUCKETS)
+STAGE_LATENCY = Histogram("bricks_stage_duration_seconds", "Time spent in a stage of a request: model_load, parse, extract or serialize.", ("route", "stage"))
+
+METRICS = [REQUEST_LATENCY, REQUEST_SIZE, RESPONSE_SIZE, STAGE_LATENCY]
+
+# callables returning (name, type, documentation, labels, value) samples read at scrape time
+COLLECTORS: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+_scope = contextvars.ContextVar("bricks_metrics_scope", default=None)
+# stage durations collected in an executor worker process, to be recorded by the server
+_collected = contextvars.ContextVar("bricks_metrics_collected", default=None)
+
+
+def route_name(scope: Optional[dict]) -> str:
+    """Path template of the route that served the request, e.g. ``/spacy/date_extraction/``."""
+    if scope is None:
+        return ""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+@contextmanager
+def stage(name: str):
+    """Records the time spent in the block as stage ``name`` of the current request."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        collected = _collected.get()
+        if collected is not None:
+            collected.append((name, elapsed))
+        else:
+            STAGE_LATENCY.observe(elapsed, route_name(_scope.get()), name)
+        profile = profiling.current()
+        if profile is not None:
+            profile.add(name, elapsed)
+
+
+@contextmanager
+def collect_stages():
+    """Collects the stages of the block into the yielded list instead of recording them.
+
+    Used by executor worker processes, whose metrics are never scraped; the server records
+    the collected stages with ``record_stages`` for the route of the request.
+    """
+    stages = []
+    token = _collected.set(stages)
+    try:
+        yield stages
+    finally:
+        _collected.reset(token)
+
+
+def record_stages(stages: Iterable[Tuple[str, float]]):
+    route = route_name(_scope.get())
+    for name, elapsed in stages:
+        STAGE_LATENCY.observe(elapsed, route, name)
+
+
+def register_collector(collector):
+    COLLECTORS.append(collector)
+    return collector
+
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    seen = set()
+    for collector in COLLECTORS:
+        for name, kind, documentation, labels, value in collector():
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and payload sizes per route.
+
+    A plain ASGI middleware rather than ``@app.middleware("http")``, so responses are not
+    buffered and streamed request bodies keep working.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        token = _scope.set(scope)
+        start = time.perf_counter()
+        status = {"code": 500, "size": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                for key, value in message.get("headers", ()):
+                    if key == b"content-length":
+                        status["size"] = int(value)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_name(scope)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, route, scope["method"], str(status["code"]))
+            for key, value in scope.get("headers", ()):
+                if key == b"content-length":
+                    REQUEST_SIZE.observe(int(value), route)
+                    break
+            if status["size"] is not None:
+                RESPONSE_SIZE.observe(status["size"], route)
+            _scope.reset(token)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse recording the time spent in rendering the content as stage ``serialize``."""
+
+    def render(self, content) -> bytes:
+        with stage("serialize"):
+            return super().render(content)
@@ -0,0 +1,37 @@
+import gc
+from typing import Iterable
+
+from util.utils import LangEnum, SpacySingleton, env_list
+
+
+def preload_resources(routers: Iterable[str]):
+    """Loads the pipelines and lexical resources of the given routers and freezes them.
+
+    Meant to run once in the gunicorn master (see ``BRICKS_PRELOAD`` in gunicorn.config.py):
+    workers forked afterwards share these pages copy-on-write. ``gc.freeze`` moves everything
+    allocated so far to the permanent generation, so the collectors of the workers never
+    write to (and thereby copy) the shared objects' headers.
+    """
+    routers = set(routers)
+    SpacySingleton.preload(env_list("SPACY_PRELOAD") or [lang.name for lang in LangEnum])
+
+    if "nltk" in routers or "textblob" in routers:
+        from nltk.corpus import brown, stopwords, wordnet, words
+
+        for corpus in (stopwords, words, wordnet, brown):
+            try:
+                corpus.ensure_loaded()
+            except LookupError:
+                # corpus not downloaded, the routes using it fail as before
+                pass
+    if "nltk" in routers:
+        from nltk_api import get_english_lexicon
+
+        get_english_lexicon()
+    if "other" in routers:
+        from other_api import get_vader_analyzer
+
+        get_vader_analyzer()
+
+    gc.collect()
+    gc.freeze()
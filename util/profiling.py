@@ -0,0 +1,187 @@
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+# Profiling is off unless BRICKS_PROFILING=1; then a request asks for it with the header
+# "X-Bricks-Profile: 1" or the query parameter "profile=1".
+ENABLED = os.environ.get("BRICKS_PROFILING", "0").lower() in ("1", "true", "yes")
+INTERVAL = int(os.environ.get("BRICKS_PROFILING_INTERVAL_MS") or 5) / 1000
+TOP = 25
+
+_profile = contextvars.ContextVar("bricks_profile", default=None)
+
+
+class Profile:
+    """Timings of one request: explicitly timed sections plus a sampled call-stack profile.
+
+    The sampler thread looks at the stacks of the threads that run the handler every
+    ``INTERVAL`` seconds; a stack seen in n samples is reported as n * ``INTERVAL`` seconds.
+    """
+
+    def __init__(self):
+        self.sections = Counter()
+        self.stacks = Counter()
+        self.samples = 0
+        self.thread_ids = set()
+        self.start = time.perf_counter()
+        self.wall_time = 0.0
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name="bricks-profiler", daemon=True)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.sections[name] += seconds
+
+    def _sample(self):
+        while not self._stopped.wait(INTERVAL):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append((frame.f_globals.get("__name__", "?"), frame.f_code.co_name))
+                    frame = frame.f_back
+                with self._lock:
+                    self.stacks[tuple(reversed(stack))] += 1
+                    self.samples += 1
+
+    def __enter__(self):
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopped.set()
+        self._sampler.join()
+        self.wall_time = time.perf_counter() - self.start
+
+    def report(self):
+        libraries, functions = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            for library in {module.split(".")[0] for module, _ in stack}:
+                libraries[library] += count
+            for function in {f"{module}.{name}" for module, name in stack}:
+                functions[function] += count
+
+        def seconds(count):
+            return round(count * INTERVAL, 4)
+
+        return {
+            "wallTime": round(self.wall_time, 4),
+            "interval": INTERVAL,
+            "samples": self.samples,
+            "sections": {name: round(value, 4) for name, value in self.sections.most_common()},
+            # inclusive sampled time per top level package, e.g. spacy, thinc, textstat, re
+            "libraries": {name: seconds(count) for name, count in libraries.most_common(TOP)},
+            "functions": [{"function": name, "time": seconds(count)} for name, count in functions.most_common(TOP)],
+            "stacks": [
+                {"stack": ";".join(f"{module}.{name}" for module, name in stack), "time": seconds(count)}
+                for stack, count in self.stacks.most_common(TOP)
+            ],
+        }
+
+
+def current() -> Optional[Profile]:
+    return _profile.get()
+
+
+@contextmanager
+def section(name: str):
+    """Times the block into the profile of the current request; a no-op when not profiling."""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+def timed_pipeline(nlp, text: str):
+    """Runs ``nlp`` on a text component by component, timing each one into the current profile."""
+    with section("spacy.tokenizer"):
+        doc = nlp.make_doc(text)
+    for name, component in nlp.pipeline:
+        with section(f"spacy.{name}"):
+            doc = component(doc)
+    return doc
+
+
+def requested(request: Request) -> bool:
+    return request.headers.get("x-bricks-profile", "") in ("1", "true") or request.query_params.get("profile") in ("1", "true")
+
+
+def _track_thread(func):
+    """Wraps an endpoint so the thread running it is sampled while a profile is active."""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            profile = _profile.get()
+            if profile is not None:
+                profile.thread_ids.add(threading.get_ident())
+            return await func(*args, **kwargs)
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _profile.get()
+            if profile is not None:
+                profile.thread_ids.add(threading.get_ident())
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """Route class of the routers that adds a ``_profile`` to JSON responses of profiled requests.
+
+    Without ``BRICKS_PROFILING`` the route is a plain APIRoute.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if ENABLED:
+            endpoint = _track_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if not ENABLED:
+            return handler
+
+        async def profiled_handler(request: Request):
+            if not requested(request):
+                return await handler(request)
+
+            profile = Profile()
+            token = _profile.set(profile)
+            try:
+                with profile:
+                    response = await handler(request)
+            finally:
+                _profile.reset(token)
+
+            if not isinstance(response, JSONResponse):
+                return response
+            content = json.loads(response.body)
+            if not isinstance(content, dict):
+                content = {"response": content}
+            content["_profile"] = profile.report()
+            headers = {key: value for key, value in response.headers.items() if key not in ("content-length", "content-type")}
+            return JSONResponse(content, status_code=response.status_code, headers=headers, background=response.background)
+
+        return profiled_handler
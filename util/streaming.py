@@ -0,0 +1,62 @@
+import json
+from typing import Any, AsyncIterator, List
+
+from fastapi import Request
+from starlette.responses import StreamingResponse
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Streams newline delimited JSON while the request body is still being read.
+
+    Starlette's StreamingResponse listens for a client disconnect on ``receive`` during
+    streaming, which would swallow the body chunks the generator is reading, so this
+    response only streams.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def ndjson_line(obj: Any) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def iter_lines(request: Request, max_line_bytes: int = 16 * 1024 * 1024) -> AsyncIterator[bytes]:
+    """Yields the non-empty lines of the request body as they arrive."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        if b"\n" not in buffer:
+            if len(buffer) > max_line_bytes:
+                raise ValueError(f"line longer than {max_line_bytes} bytes")
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def iter_batches(lines: AsyncIterator[bytes], batch_size: int) -> AsyncIterator[List[bytes]]:
+    batch = []
+    async for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def parse_record(line: bytes, position: int):
+    """Parses one NDJSON record, either an object with ``text`` (and ``id``) or a plain string."""
+    record = json.loads(line)
+    if isinstance(record, str):
+        return position, record
+    if not isinstance(record["text"], str):
+        raise TypeError("text must be a string")
+    return record.get("id", position), record["text"]
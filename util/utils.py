@@ -1,20 +1,297 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
 from enum import Enum
+from typing import Iterable, List, Optional
+
 import spacy
+from spacy.tokens import Doc
+
+from util.doc_cache import DocCache
+from util import profiling
+from util.metrics import stage
 
 class LangEnum(str, Enum):
     EN = 'en_core_web_sm'
     FR = 'fr_core_news_sm'
     LA = 'la_core_web_lg'
 
+
+def env_int(name: str, default: int) -> int:
+    """Reads an integer setting from the environment."""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def env_list(name: str, default: str = "") -> List[str]:
+    """Reads a comma separated setting from the environment."""
+    return [item.strip() for item in os.environ.get(name, default).split(",") if item.strip()]
+
+
+def data_dir(*parts: str) -> str:
+    """Directory for data built at runtime (lexicons, indexes, ...), shared by all workers of a box.
+
+    ``BRICKS_DATA_DIR``, defaults to ~/.cache/bricks; created on first use.
+    """
+    path = os.path.join(os.environ.get("BRICKS_DATA_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "bricks"), *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def current_rss() -> int:
+    """Resident set size of the current process in bytes, 0 if it cannot be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def memory_usage() -> dict:
+    """Resident memory of the current process split into shared and private pages, in bytes.
+
+    Read from /proc/self/smaps_rollup (Linux 4.14+); empty if it cannot be read. ``pss``
+    charges shared pages proportionally, so summing it over the workers gives their real use.
+    """
+    fields = {
+        "Rss": "rss",
+        "Pss": "pss",
+        "Shared_Clean": "sharedClean",
+        "Shared_Dirty": "sharedDirty",
+        "Private_Clean": "privateClean",
+        "Private_Dirty": "privateDirty",
+    }
+    usage = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in fields:
+                    usage[fields[name]] = int(value.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return {}
+    usage["shared"] = usage.get("sharedClean", 0) + usage.get("sharedDirty", 0)
+    usage["private"] = usage.get("privateClean", 0) + usage.get("privateDirty", 0)
+    return usage
+
+
+# places to cut a long text, best first: paragraph breaks, line breaks, sentence ends, any whitespace
+BOUNDARIES = (re.compile(r"\n[^\S\n]*\n\s*"), re.compile(r"\n\s*"), re.compile(r"[.!?;:]\s+"), re.compile(r"\s+"))
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Cuts a text into consecutive chunks of at most ``max_chars`` characters.
+
+    Each cut is placed after the last boundary of the best kind found in the second half of
+    the chunk (see BOUNDARIES), so no token is split unless a chunk holds no whitespace at
+    all. Joining the chunks gives back the text.
+    """
+    chunks = []
+    start = 0
+    while len(text) - start > max_chars:
+        end = start + max_chars
+        cut = end
+        for boundary in BOUNDARIES:
+            last = None
+            for last in boundary.finditer(text, start + max_chars // 2, end):
+                pass
+            if last is not None:
+                cut = last.end()
+                break
+        chunks.append(text[start:cut])
+        start = cut
+    chunks.append(text[start:])
+    return chunks
+
+
+doc_cache = DocCache(env_int("DOC_CACHE_MB", 64) * 1024 * 1024,
+                     os.environ.get("DOC_CACHE_DIR") or None,
+                     env_int("DOC_CACHE_DIR_MB", 256) * 1024 * 1024)
+
+
+class LoadedModel:
+    def __init__(self, nlp, load_time: float, size: int):
+        self.nlp = nlp
+        self.load_time = load_time
+        self.size = size
+        self.loaded_at = time.time()
+
+
 class SpacySingleton:
-    nlps = { LangEnum.FR : None,
-             LangEnum.EN : None,
-             LangEnum.LA : None
-             }
+    """Process-wide registry of loaded spaCy pipelines.
+
+    Pipelines are keyed by language and the components excluded at load time, kept in
+    LRU order and evicted once their summed resident size exceeds
+    ``SPACY_MODEL_MEMORY_MB`` (0 disables the budget). ``SPACY_PRELOAD`` lists the
+    languages (e.g. ``EN,FR``) loaded eagerly by ``preload``. ``SPACY_MAX_PROCESSES`` caps the
+    ``n_process`` a request may ask nlp.pipe for; every call with more than one starts (and
+    sends the pipeline to) that many new processes.
+
+    Texts longer than the pipeline's ``max_length`` (or a lower ``SPACY_CHUNK_CHARS``) are
+    parsed in chunks cut at paragraph or sentence boundaries and stitched back into one Doc
+    with the offsets of the whole text. ``SPACY_CHUNK_PROCESSES`` (default 1, inline) parses
+    the chunks of a text in parallel; like any n_process above one it starts new processes
+    for every such text.
+    """
+    nlps = OrderedDict()
+    memory_budget = env_int("SPACY_MODEL_MEMORY_MB", 0) * 1024 * 1024
+    max_processes = env_int("SPACY_MAX_PROCESSES", 1)
+    chunk_chars = env_int("SPACY_CHUNK_CHARS", 0)
+    chunk_processes = env_int("SPACY_CHUNK_PROCESSES", 1)
+    hits = 0
+    misses = 0
+    evictions = 0
+
+    _lock = threading.Lock()
+    _load_lock = threading.Lock()
+
+    @staticmethod
+    def _key(lang: LangEnum, exclude: Iterable[str] = ()):
+        return LangEnum(lang), tuple(sorted(exclude or ()))
+
+    @classmethod
+    def _lookup(cls, key):
+        with cls._lock:
+            model = cls.nlps.get(key)
+            if model is not None:
+                cls.nlps.move_to_end(key)
+                cls.hits += 1
+                return model.nlp
+        return None
 
     @classmethod
-    def get_nlp(cls, lang: LangEnum):
-        nlp = cls.nlps[lang]
-        if nlp is None:
-            nlp = spacy.load(lang.value)
+    def get_nlp(cls, lang: LangEnum, exclude: Iterable[str] = ()):
+        key = cls._key(lang, exclude)
+        nlp = cls._lookup(key)
+        if nlp is not None:
+            return nlp
+
+        # Loads are serialized, so concurrent misses for the same pipeline wait for the
+        # first one instead of loading it again, and RSS deltas are not mixed up.
+        with cls._load_lock:
+            nlp = cls._lookup(key)
+            if nlp is not None:
+                return nlp
+
+            rss_before = current_rss()
+            start = time.perf_counter()
+            with stage("model_load"):
+                nlp = spacy.load(key[0].value, exclude=list(key[1]))
+            model = LoadedModel(nlp, time.perf_counter() - start, max(current_rss() - rss_before, 0))
+
+            with cls._lock:
+                cls.misses += 1
+                cls.nlps[key] = model
+                cls._evict()
         return nlp
+
+    @classmethod
+    def get_doc(cls, lang: LangEnum, text: str, exclude: Iterable[str] = (), tokenizer_only: bool = False):
+        """Parses a text, reusing the Doc of an earlier request for the same text and pipeline.
+
+        With ``tokenizer_only`` only the tokenizer of the pipeline runs, which yields the same
+        tokens (and token offsets) as the full pipeline. The returned Doc may be shared with
+        other requests and must not be modified.
+        """
+        return cls.get_docs(lang, [text], exclude, tokenizer_only=tokenizer_only)[0]
+
+    @classmethod
+    def get_docs(cls,
+                 lang: LangEnum,
+                 texts: List[str],
+                 exclude: Iterable[str] = (),
+                 tokenizer_only: bool = False,
+                 batch_size: int = 64,
+                 n_process: int = 1):
+        """Batch version of get_doc: texts that are not cached are parsed together with nlp.pipe."""
+        n_process = max(1, min(n_process, cls.max_processes))
+        key = cls._key(lang, exclude)
+        nlp = cls.get_nlp(*key)
+        config = ("tokenizer",) if tokenizer_only else key[1]
+        version = nlp.meta.get("version", "")
+        cache_keys = [DocCache.key(key[0].value, version, config, text) for text in texts]
+        docs = [doc_cache.get(cache_key, nlp.vocab) for cache_key in cache_keys]
+        if tokenizer_only:
+            # a fully parsed Doc of the same text has the very same tokens
+            for i, doc in enumerate(docs):
+                if doc is None:
+                    docs[i] = doc_cache.get(DocCache.key(key[0].value, version, key[1], texts[i]), nlp.vocab)
+
+        missing = [i for i, doc in enumerate(docs) if doc is None]
+        if not missing:
+            return docs
+        with stage("parse"):
+            if not tokenizer_only:
+                max_chars = min(cls.chunk_chars or nlp.max_length, nlp.max_length)
+                for i in [i for i in missing if len(texts[i]) > max_chars]:
+                    docs[i] = cls._parse_chunked(nlp, texts[i], max_chars, batch_size, cls.chunk_processes)
+                    doc_cache.put(cache_keys[i], docs[i])
+                missing = [i for i in missing if docs[i] is None]
+
+            if tokenizer_only:
+                parsed = nlp.tokenizer.pipe((texts[i] for i in missing), batch_size=batch_size)
+            elif profiling.current() is not None:
+                parsed = [profiling.timed_pipeline(nlp, texts[i]) for i in missing]
+            elif len(missing) <= 1:
+                parsed = [nlp(texts[i]) for i in missing]
+            else:
+                parsed = nlp.pipe((texts[i] for i in missing), batch_size=batch_size, n_process=n_process)
+            for i, doc in zip(missing, parsed):
+                docs[i] = doc
+                doc_cache.put(cache_keys[i], doc)
+        return docs
+
+    @staticmethod
+    def _parse_chunked(nlp, text: str, max_chars: int, batch_size: int, n_process: int):
+        """Parses the chunks of a long text and joins them into one Doc over the whole text.
+
+        ``Doc.from_docs`` shifts the token indices and character offsets of every chunk by the
+        length of the chunks before it; the chunks keep their trailing whitespace, so no
+        whitespace is added in between and the Doc's text is the original one.
+        """
+        chunks = split_text(text, max_chars)
+        if profiling.current() is not None:
+            parsed = [profiling.timed_pipeline(nlp, chunk) for chunk in chunks]
+        else:
+            parsed = list(nlp.pipe(chunks, batch_size=batch_size, n_process=min(n_process, len(chunks))))
+        return Doc.from_docs(parsed, ensure_whitespace=False)
+
+    @classmethod
+    def _evict(cls):
+        if not cls.memory_budget:
+            return
+        while len(cls.nlps) > 1 and sum(model.size for model in cls.nlps.values()) > cls.memory_budget:
+            cls.nlps.popitem(last=False)
+            cls.evictions += 1
+
+    @classmethod
+    def preload(cls, langs: Optional[Iterable[str]] = None):
+        """Loads the given languages (names or values of LangEnum), defaults to SPACY_PRELOAD."""
+        if langs is None:
+            langs = env_list("SPACY_PRELOAD")
+        for lang in langs:
+            cls.get_nlp(LangEnum[lang.upper()] if lang.upper() in LangEnum.__members__ else LangEnum(lang))
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            models = [
+                {
+                    "lang": lang.name,
+                    "model": lang.value,
+                    "exclude": list(exclude),
+                    "loadTime": round(model.load_time, 3),
+                    "residentBytes": model.size,
+                    "loadedAt": model.loaded_at,
+                }
+                for (lang, exclude), model in cls.nlps.items()
+            ]
+            return {
+                "models": models,
+                "memoryBudget": cls.memory_budget,
+                "hits": cls.hits,
+                "misses": cls.misses,
+                "evictions": cls.evictions,
+            }